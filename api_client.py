@@ -1,132 +1,605 @@
 # api_client.py
+import asyncio
 import httpx
 import logging
-from typing import Optional, Dict, Any, List
+import os
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from cache import TTLCache
+from conditional import ConditionalStore
+from write_behind import WRITE_BEHIND, user_writes
+from routes import RouteTable
+from metrics import record_backend
+from resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, call_with_retries, hedged
+import fastjson
 
 logger = logging.getLogger(__name__)
 
-API_BASE_URL = "https://matchafricabackend.onrender.com"
+API_BASE_URL = os.getenv("API_BASE_URL", "https://matchafricabackend.onrender.com")
+
+# Connection pool settings for the shared backend client (tunable via env)
+BACKEND_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", "30.0"))
+BACKEND_CONNECT_TIMEOUT = float(os.getenv("BACKEND_CONNECT_TIMEOUT", "5.0"))
+BACKEND_MAX_CONNECTIONS = int(os.getenv("BACKEND_MAX_CONNECTIONS", "20"))
+BACKEND_MAX_KEEPALIVE = int(os.getenv("BACKEND_MAX_KEEPALIVE", "10"))
+BACKEND_KEEPALIVE_EXPIRY = float(os.getenv("BACKEND_KEEPALIVE_EXPIRY", "60.0"))
+BACKEND_HTTP2 = os.getenv("BACKEND_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Read-through profile cache keyed by Telegram ID (written through on create/update)
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "5000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+
+# Last document the backend returned per user, used to diff updates (outlives the profile cache)
+SERVER_STATE_TTL = float(os.getenv("SERVER_STATE_TTL", "3600"))
+
+# How long to remember that the backend lacks an optional endpoint (paged leaderboard, rank, PATCH)
+PAGED_PROBE_INTERVAL = float(os.getenv("PAGED_PROBE_INTERVAL", "600"))
+
+_client: Optional[httpx.AsyncClient] = None
+profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL, name="profiles")
+server_state = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=SERVER_STATE_TTL, name="server_state")
+# Counters for diffed user writes
+_write_stats = {"skipped": 0, "patched": 0, "put": 0, "bytes_sent": 0, "bytes_avoided": 0}
+# Shared by every backend call: while the backend is down handlers fall back immediately
+backend_breaker = CircuitBreaker("backend")
+# Final URLs of redirected endpoints and which create endpoint works
+routes = RouteTable()
+# Validators + parsed bodies for conditional GETs of profiles and the leaderboard
+conditional = ConditionalStore()
+# Profile reads are hedged once they run past the recent p95
+profile_latency = LatencyTracker("get_user")
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _build_client() -> httpx.AsyncClient:
+    """Create the pooled backend client"""
+    http2 = BACKEND_HTTP2
+    if http2 and not _http2_available():
+        logger.warning("⚠️ BACKEND_HTTP2 is set but `h2` is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=BACKEND_MAX_CONNECTIONS,
+        max_keepalive_connections=BACKEND_MAX_KEEPALIVE,
+        keepalive_expiry=BACKEND_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(BACKEND_TIMEOUT, connect=BACKEND_CONNECT_TIMEOUT),
+        limits=limits,
+        http2=http2,
+        follow_redirects=True,
+    )
+
+async def init_client() -> httpx.AsyncClient:
+    """Open the shared backend client (called from the FastAPI lifespan)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info(
+            f"🔌 Backend client ready (max_connections={BACKEND_MAX_CONNECTIONS}, "
+            f"keepalive={BACKEND_MAX_KEEPALIVE})"
+        )
+    return _client
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared backend client, creating it lazily (e.g. in polling mode)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+async def close_client() -> None:
+    """Close the shared backend client and release pooled connections"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("🔌 Backend client closed")
+    _client = None
+
+async def _request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a backend request through the circuit breaker, retrying when it's safe to"""
+    client = get_client()
+    return await call_with_retries(
+        backend_breaker, method, lambda: client.request(method, url, **kwargs)
+    )
+
+async def _call(method: str, template: str, path: Optional[str] = None, **kwargs) -> httpx.Response:
+    """
+    Request a logical endpoint (`template`, e.g. "/users/{id}") at its learned URL.
+
+    If a learned URL stops working the route is forgotten and the canonical URL is tried
+    once, so it gets re-learned.
+    """
+    path = path or template
+    learned = routes.is_learned(template)
+    started = time.monotonic()
+    status: Any = "error"
+    try:
+        try:
+            response = await _request(method, routes.url(template, API_BASE_URL, path), **kwargs)
+            if learned and _is_missing_route(response):
+                raise LookupError(f"learned route for {template} returned {response.status_code}")
+        except (httpx.TransportError, LookupError):
+            if not learned:
+                raise
+            routes.forget(template)
+            response = await _request(method, f"{API_BASE_URL}{path}", **kwargs)
+        status = response.status_code
+    except httpx.TimeoutException:
+        status = "timeout"
+        raise
+    except CircuitOpenError:
+        status = "circuit_open"
+        raise
+    except httpx.TransportError:
+        status = "transport_error"
+        raise
+    except asyncio.CancelledError:
+        # e.g. the losing half of a hedged read
+        status = "cancelled"
+        raise
+    finally:
+        record_backend(template, method, started, status)
+    routes.observe(template, path, response)
+    return response
+
+def route_stats() -> Dict[str, Any]:
+    return routes.stats()
+
+def conditional_stats() -> Dict[str, Any]:
+    return conditional.stats()
+
+def backend_breaker_stats() -> Dict[str, Any]:
+    return backend_breaker.stats()
+
+def backend_latency_stats() -> Dict[str, Any]:
+    return {"get_user": profile_latency.stats()}
+
+def _cache_profile(user: Optional[Dict]) -> None:
+    """Write a backend user document through to the profile cache"""
+    if user and user.get('id') is not None:
+        profile_cache.set(int(user['id']), user)
+        server_state.set(int(user['id']), user)
+
+def invalidate_user(tg_id: int) -> None:
+    """Forget the cached profile so the next read hits the backend"""
+    server_state.invalidate(int(tg_id))
+    if profile_cache.invalidate(int(tg_id)):
+        logger.info(f"🧹 Profile cache invalidated for {tg_id}")
+
+def profile_cache_stats() -> Dict[str, Any]:
+    return profile_cache.stats()
+
+def peek_user(tg_id: int) -> Optional[Dict]:
+    """Cached profile (with buffered writes applied) or None, never calls the backend"""
+    return user_writes.overlay(tg_id, server_state.get(int(tg_id)) or profile_cache.get(int(tg_id)))
+
+def user_write_stats() -> Dict[str, Any]:
+    return dict(_write_stats)
+
+def diff_user(known: Dict[str, Any], user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of user_data that differ from the last-known server document"""
+    return {
+        field: value for field, value in user_data.items()
+        if field != 'id' and (field not in known or known[field] != value)
+    }
+
+# Create endpoints in order of preference; the one that works is remembered
+CREATE_ENDPOINTS = ("/users", "/api/users")
+
+async def _create(user_data: Dict[str, Any], candidates) -> Optional[Dict]:
+    """POST the new user to the endpoint that worked last time, trying the others if it's gone"""
+    for template in routes.ordered("create_user", candidates):
+        response = await _call("POST", template, json=user_data)
+        logger.info(f"🔍 Create user response status ({template}): {response.status_code}")
+        
+        if response.status_code in [200, 201]:
+            routes.choose("create_user", template)
+            logger.info(f"✅ User created successfully: {user_data.get('username')}")
+            created = fastjson.loads(response.content)
+            _cache_profile(created)
+            return created
+        
+        if not _is_missing_route(response):
+            logger.error(f"❌ Failed to create user: {response.status_code} - {response.text}")
+            return None
+        if routes.chosen("create_user") == template:
+            routes.unchoose("create_user")
+    
+    logger.error("❌ No create endpoint accepted the user")
+    return None
 
 async def create_user(user_data: Dict[str, Any]) -> Optional[Dict]:
     """Create a new user via API"""
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.post(
-                f"{API_BASE_URL}/users",
-                json=user_data
-            )
-            
-            logger.info(f"🔍 Create user response status: {response.status_code}")
-            logger.info(f"🔍 Response headers: {dict(response.headers)}")
-            
-            if response.status_code in [200, 201, 307]:
-                # Handle 307 redirect by following it
-                if response.status_code == 307:
-                    redirect_url = response.headers.get('location')
-                    if redirect_url:
-                        logger.info(f"🔄 Following redirect to: {redirect_url}")
-                        response = await client.post(
-                            redirect_url,
-                            json=user_data
-                        )
-                        logger.info(f"🔍 Redirect response status: {response.status_code}")
-                
-                if response.status_code in [200, 201]:
-                    logger.info(f"✅ User created successfully: {user_data.get('username')}")
-                    return response.json()
-                else:
-                    logger.error(f"⚠️ Unexpected status after redirect: {response.status_code}")
-                    return None
-            else:
-                logger.error(f"❌ Failed to create user: {response.status_code} - {response.text}")
-                return None
+        return await _create(user_data, CREATE_ENDPOINTS)
     except Exception as e:
         logger.error(f"❌ Error creating user: {e}")
         return None
 
+async def _send_user_write(method: str, user_id: int, payload: Dict[str, Any]) -> httpx.Response:
+    body = fastjson.dumps(payload)
+    _write_stats["bytes_sent"] += len(body)
+    return await _call(
+        method, "/users/{id}", f"/users/{user_id}",
+        content=body, headers={"Content-Type": "application/json"}
+    )
+
 async def update_user(user_id: int, user_data: Dict[str, Any]) -> Optional[Dict]:
-    """Update existing user via API"""
+    """
+    Update existing user via API.
+
+    Only fields that differ from the last document the backend sent are written (PATCH);
+    nothing is sent when nothing changed. When the backend doesn't support PATCH, the changes
+    are merged onto that document and written with a full PUT, so a partial `user_data`
+    never replaces fields it doesn't mention.
+    """
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.put(
-                f"{API_BASE_URL}/users/{user_id}",
-                json=user_data
-            )
-            
-            logger.info(f"🔍 Update user response status: {response.status_code}")
+        known = server_state.get(int(user_id))
+        if known is None:
+            # Read the server copy first: diffing (or a PUT) needs the whole document
+            await get_user_by_tg_id(user_id, use_cache=False)
+            known = server_state.get(int(user_id))
+            if known is None:
+                logger.error(f"❌ Cannot update user {user_id}: no server copy to write onto")
+                return None
+        full_size = len(fastjson.dumps(user_data))
+        
+        changes = diff_user(known, user_data)
+        if not changes:
+            _write_stats["skipped"] += 1
+            _write_stats["bytes_avoided"] += full_size
+            logger.info(f"✅ User {user_id} unchanged, skipping update")
+            return known
+        
+        if _endpoint_supported("patch_user"):
+            response = await _send_user_write("PATCH", user_id, changes)
+            logger.info(f"🔍 Patch user response status: {response.status_code} ({', '.join(changes)})")
             
             if response.status_code == 200:
-                logger.info(f"✅ User {user_id} updated successfully")
-                return response.json()
-            elif response.status_code == 307:
-                # Handle redirect for PUT as well
-                redirect_url = response.headers.get('location')
-                if redirect_url:
-                    logger.info(f"🔄 Following redirect to: {redirect_url}")
-                    response = await client.put(redirect_url, json=user_data)
-                    if response.status_code == 200:
-                        return response.json()
-            
-            logger.error(f"❌ Failed to update user {user_id}: {response.status_code} - {response.text}")
-            return None
+                _write_stats["patched"] += 1
+                _write_stats["bytes_avoided"] += max(0, full_size - len(fastjson.dumps(changes)))
+                updated = fastjson.loads(response.content)
+                if not isinstance(updated, dict) or updated.get('id') is None:
+                    # Backend acknowledged without echoing the document
+                    updated = {**known, **changes}
+                _cache_profile(updated)
+                return updated
+            if response.status_code == 501 or _is_missing_route(response):
+                _mark_unsupported("patch_user")
+            else:
+                logger.error(f"❌ Failed to patch user {user_id}: {response.status_code} - {response.text}")
+                invalidate_user(user_id)
+                return None
+
+        merged = {**known, **user_data}
+        response = await _send_user_write("PUT", user_id, merged)
+            
+        logger.info(f"🔍 Update user response status: {response.status_code}")
+            
+        if response.status_code == 200:
+            _write_stats["put"] += 1
+            logger.info(f"✅ User {user_id} updated successfully")
+            updated = fastjson.loads(response.content)
+            if not isinstance(updated, dict) or updated.get('id') is None:
+                updated = merged
+            _cache_profile(updated)
+            return updated
+            
+        logger.error(f"❌ Failed to update user {user_id}: {response.status_code} - {response.text}")
+        # The server copy may now differ from what we hold
+        invalidate_user(user_id)
+        return None
     except Exception as e:
         logger.error(f"❌ Error updating user {user_id}: {e}")
         return None
 
-async def get_user_by_tg_id(tg_id: int) -> Optional[Dict]:
-    """Get user by Telegram ID using /users/{id} endpoint"""
+async def bulk_update_users(batch: Dict[int, Dict[str, Any]]) -> Optional[Dict[int, Optional[Dict]]]:
+    """
+    Write several users' changes in one PATCH /users/bulk request.
+
+    Returns {user_id: document or None}, or None when the backend has no bulk endpoint
+    (the caller then falls back to update_user per user).
+    """
+    if not _endpoint_supported("bulk_update"):
+        return None
+    
+    results: Dict[int, Optional[Dict]] = {}
+    items = []
+    for user_id, user_data in batch.items():
+        known = server_state.get(int(user_id))
+        changes = diff_user(known, user_data) if known is not None else dict(user_data)
+        if not changes:
+            _write_stats["skipped"] += 1
+            results[user_id] = known
+            continue
+        items.append({"id": user_id, **changes})
+    if not items:
+        return results
+    
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(f"{API_BASE_URL}/users/{tg_id}")
+        body = fastjson.dumps(items)
+        _write_stats["bytes_sent"] += len(body)
+        response = await _call(
+            "PATCH", "/users/bulk", content=body, headers={"Content-Type": "application/json"}
+        )
+        
+        if response.status_code == 200:
+            _write_stats["patched"] += len(items)
+            returned = fastjson.loads(response.content)
+            by_id = {}
+            if isinstance(returned, list):
+                by_id = {int(doc['id']): doc for doc in returned if isinstance(doc, dict) and doc.get('id') is not None}
+            for item in items:
+                user_id = int(item['id'])
+                doc = by_id.get(user_id)
+                if doc is None:
+                    known = server_state.get(user_id)
+                    doc = {**(known or {}), **item}
+                _cache_profile(doc)
+                results[user_id] = doc
+            return results
+        
+        # 422: "bulk" was taken for a /users/{id} path parameter, i.e. there's no such route
+        if response.status_code in (422, 501) or _is_missing_route(response):
+            _mark_unsupported("bulk_update")
+            return None
+        
+        logger.error(f"❌ Bulk update of {len(items)} users failed: {response.status_code} - {response.text}")
+    except Exception as e:
+        logger.error(f"❌ Error in bulk update of {len(items)} users: {e}")
+    
+    for item in items:
+        invalidate_user(item['id'])
+        results[int(item['id'])] = None
+    return results
+
+async def queue_user_update(user_id: int, user_data: Dict[str, Any]) -> Optional[Dict]:
+    """
+    Update a user via the write-behind buffer (or right away with WRITE_BEHIND=off).
+
+    Returns the document as it will be once the write lands (reads see it immediately), or
+    None when there's no server copy to apply it to yet; the write is queued either way.
+    """
+    if WRITE_BEHIND == "off":
+        return await update_user(user_id, user_data)
+    user_writes.add(user_id, user_data)
+    known = server_state.get(int(user_id))
+    # Overlaying onto nothing would hand back a partial document that looks like a profile
+    return user_writes.overlay(user_id, known) if known is not None else None
+
+async def get_user_by_tg_id(tg_id: int, use_cache: bool = True) -> Optional[Dict]:
+    """Get user by Telegram ID using /users/{id} endpoint (read-through profile cache, with buffered writes applied)"""
+    if use_cache:
+        cached = profile_cache.get(int(tg_id))
+        if cached is not None:
+            return user_writes.overlay(tg_id, cached)
+
+    key = ("/users/{id}", int(tg_id))
+    try:
+        # Conditional GET: an unchanged profile comes back as a bodiless 304
+        headers = conditional.headers_for(key)
+        response = await hedged(
+            profile_latency, lambda: _call("GET", "/users/{id}", f"/users/{tg_id}", headers=headers)
+        )
+        if response.status_code == 304 and not conditional.has_body(key):
+            # Our copy was evicted while the request was out: ask again for the full body
+            response = await _call("GET", "/users/{id}", f"/users/{tg_id}")
             
-            logger.info(f"🔍 Get user response status: {response.status_code}")
+        logger.info(f"🔍 Get user response status: {response.status_code}")
             
-            if response.status_code == 200:
-                logger.info(f"✅ User {tg_id} fetched successfully")
-                return response.json()
-            elif response.status_code == 307:
-                # Handle redirect
-                redirect_url = response.headers.get('location')
-                if redirect_url:
-                    logger.info(f"🔄 Following redirect to: {redirect_url}")
-                    response = await client.get(redirect_url)
-                    if response.status_code == 200:
-                        return response.json()
-            
-            # User doesn't exist yet or other error
-            logger.info(f"ℹ️ User {tg_id} not found or error: {response.status_code}")
-            return None
+        if response.status_code in (200, 304):
+            logger.info(f"✅ User {tg_id} fetched successfully")
+            user, _ = conditional.resolve(key, response)
+            _cache_profile(user)
+            # Buffered writes that haven't reached the backend yet still show up
+            return user_writes.overlay(tg_id, user)
+            
+        conditional.forget(key)
+        # User doesn't exist yet or other error
+        logger.info(f"ℹ️ User {tg_id} not found or error: {response.status_code}")
+        return None
     except Exception as e:
         logger.error(f"❌ Error getting user {tg_id}: {e}")
         return None
 
 async def get_leaderboard() -> Optional[List[Dict]]:
-    """Get leaderboard data from API"""
+    """Get leaderboard data from API (the same list object as last time if it didn't change)"""
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(
-                f"{API_BASE_URL}/users/leaderboard"
-            )
+        key = "/users/leaderboard"
+        response = await _call("GET", "/users/leaderboard", headers=conditional.headers_for(key))
+        if response.status_code == 304 and not conditional.has_body(key):
+            response = await _call("GET", "/users/leaderboard")
             
-            logger.info(f"🔍 Leaderboard response status: {response.status_code}")
+        logger.info(f"🔍 Leaderboard response status: {response.status_code}")
             
-            if response.status_code == 200:
-                logger.info("✅ Leaderboard data fetched successfully")
-                return response.json()
-            elif response.status_code == 307:
-                redirect_url = response.headers.get('location')
-                if redirect_url:
-                    logger.info(f"🔄 Following redirect to: {redirect_url}")
-                    response = await client.get(redirect_url)
-                    if response.status_code == 200:
-                        return response.json()
-            
-            logger.error(f"❌ Failed to fetch leaderboard: {response.status_code} - {response.text}")
-            return None
+        if response.status_code in (200, 304):
+            logger.info("✅ Leaderboard data fetched successfully")
+            # An unchanged board is returned as the very same list object
+            entries, _ = conditional.resolve(key, response)
+            return entries
+            
+        logger.error(f"❌ Failed to fetch leaderboard: {response.status_code} - {response.text}")
+        return None
     except Exception as e:
         logger.error(f"❌ Error fetching leaderboard: {e}")
         return None
 
+# Endpoint name -> monotonic time until which we assume the backend doesn't support it
+_unsupported_until: Dict[str, float] = {}
+
+def _endpoint_supported(name: str) -> bool:
+    return _unsupported_until.get(name, 0.0) <= time.monotonic()
+
+def _mark_unsupported(name: str) -> None:
+    logger.info(f"ℹ️ Backend has no {name} endpoint, using the fallback for {PAGED_PROBE_INTERVAL:.0f}s")
+    _unsupported_until[name] = time.monotonic() + PAGED_PROBE_INTERVAL
+
+def _is_missing_route(response: httpx.Response) -> bool:
+    """True when the backend doesn't know the route at all (as opposed to a missing user)"""
+    if response.status_code == 405:
+        return True
+    if response.status_code != 404:
+        return False
+    try:
+        return fastjson.loads(response.content).get('detail') == "Not Found"
+    except Exception:
+        return True
+
+async def _snapshot_page(offset: int, limit: int) -> Optional[Dict]:
+    """Slice a page out of the locally cached leaderboard snapshot"""
+    from leaderboard import leaderboard_cache
+
+    snapshot = await leaderboard_cache.get()
+    if snapshot is None:
+        return None
+    return {
+        "entries": snapshot.entries[offset:offset + limit],
+        "total": len(snapshot),
+        "has_more": offset + limit < len(snapshot),
+        "offset": offset,
+        "version": snapshot.version,
+    }
+
+# (offset, entry ids) of the last page the backend served, to catch a backend ignoring the offset
+_last_leaderboard_page: Optional[Tuple[int, List[Any]]] = None
+
+def _repeats_last_page(offset: int, entries: List[Dict]) -> bool:
+    """True when a different offset came back with exactly the rows of the previous page"""
+    global _last_leaderboard_page
+    page_ids = [entry.get('id') for entry in entries]
+    previous = _last_leaderboard_page
+    _last_leaderboard_page = (offset, page_ids)
+    return bool(page_ids) and previous is not None and previous[0] != offset and previous[1] == page_ids
+
+async def get_leaderboard_page(offset: int, limit: int) -> Optional[Dict]:
+    """
+    Get a single leaderboard page.
+
+    Returns {"entries": [...], "total": int or None, "has_more": bool, "offset": int,
+    "version": ...}; total is None when the backend doesn't say and we hold no snapshot.
+    Falls back to slicing the cached snapshot when the backend doesn't paginate.
+    """
+    offset = max(0, offset)
+    if not _endpoint_supported("leaderboard_page"):
+        return await _snapshot_page(offset, limit)
+
+    try:
+        response = await _call("GET", "/users/leaderboard", params={"offset": offset, "limit": limit})
+        
+        logger.info(f"🔍 Leaderboard page response status: {response.status_code}")
+        
+        if response.status_code == 200:
+            from leaderboard import leaderboard_cache
+            
+            payload = fastjson.loads(response.content)
+            if isinstance(payload, list) and len(payload) > limit:
+                # Backend ignored offset/limit and sent the whole board: keep it as the snapshot
+                _mark_unsupported("leaderboard_page")
+                leaderboard_cache.seed(payload)
+                return await _snapshot_page(offset, limit)
+            
+            if isinstance(payload, dict):
+                entries = payload.get('items') or payload.get('entries') or payload.get('users') or []
+                total = payload.get('total')
+                version = payload.get('version')
+            else:
+                entries, total, version = payload, None, None
+            
+            if _repeats_last_page(offset, entries):
+                # Same rows at another offset: the backend ignores the offset
+                logger.warning(f"⚠️ Backend returned the same leaderboard page at offset {offset}, it doesn't seem to page")
+                _mark_unsupported("leaderboard_page")
+                return await _snapshot_page(offset, limit)
+            
+            if total is None:
+                # No total (skip/limit style): take it from the snapshot we hold, else leave it unknown
+                snapshot = leaderboard_cache.snapshot
+                if snapshot is not None and len(snapshot) >= offset + len(entries):
+                    total = len(snapshot)
+            if total is not None:
+                total = int(total)
+                has_more = offset + len(entries) < total
+            else:
+                has_more = len(entries) == limit
+            return {"entries": entries, "total": total, "has_more": has_more, "offset": offset, "version": version}
+        
+        elif _is_missing_route(response):
+            _mark_unsupported("leaderboard_page")
+            return await _snapshot_page(offset, limit)
+        
+        logger.error(f"❌ Failed to fetch leaderboard page: {response.status_code} - {response.text}")
+    except Exception as e:
+        logger.error(f"❌ Error fetching leaderboard page: {e}")
+    
+    return await _snapshot_page(offset, limit)
+
+async def get_user_rank(tg_id: int) -> Optional[Dict]:
+    """
+    Get a single user's leaderboard position as {"rank": int, "score": int, "total": int}.
+
+    Returns None if the user isn't ranked. Falls back to the cached snapshot index when the
+    backend has no rank endpoint.
+    """
+    if _endpoint_supported("user_rank"):
+        try:
+            response = await _call("GET", "/users/{id}/rank", f"/users/{tg_id}/rank")
+            
+            logger.info(f"🔍 User rank response status: {response.status_code}")
+            
+            if response.status_code == 200:
+                payload = fastjson.loads(response.content)
+                rank = payload.get('rank')
+                if not rank:
+                    return None
+                return {
+                    "rank": int(rank),
+                    "score": payload.get('score', 0),
+                    "total": payload.get('total'),
+                }
+            if not _is_missing_route(response):
+                # 404 for a known route means the user simply isn't ranked
+                return None
+            _mark_unsupported("user_rank")
+        except Exception as e:
+            logger.error(f"❌ Error fetching rank for {tg_id}: {e}")
+    
+    from leaderboard import leaderboard_cache
+    
+    snapshot = await leaderboard_cache.get()
+    if snapshot is None:
+        return None
+    entry = snapshot.entry_for(tg_id)
+    if entry is None:
+        return None
+    return {"rank": snapshot.rank_of(tg_id), "score": entry.get('score', 0), "total": len(snapshot)}
+
+async def list_users(offset: int, limit: int) -> Optional[List[Dict]]:
+    """Get one page of registered users (used by broadcasts)"""
+    try:
+        response = await _call("GET", "/users", params={"offset": offset, "limit": limit})
+        
+        if response.status_code == 200:
+            payload = fastjson.loads(response.content)
+            if isinstance(payload, dict):
+                payload = payload.get('items') or payload.get('users') or []
+            if len(payload) > limit:
+                # Backend ignored offset/limit and sent everyone
+                payload = payload[offset:offset + limit]
+            return payload
+        
+        logger.error(f"❌ Failed to list users at offset {offset}: {response.status_code} - {response.text}")
+        return None
+    except Exception as e:
+        logger.error(f"❌ Error listing users at offset {offset}: {e}")
+        return None
+
 async def check_user_exists(tg_id: int) -> bool:
     """Check if user exists in backend"""
     user = await get_user_by_tg_id(tg_id)
@@ -134,25 +607,9 @@ async def check_user_exists(tg_id: int) -> bool:
 
 # Alternative direct approach for creating user
 async def create_user_direct(user_data: Dict[str, Any]) -> Optional[Dict]:
-    """Alternative method to create user, bypassing redirect issues"""
+    """Alternative method to create user, preferring /api/users unless another endpoint is known to work"""
     try:
-        # Try direct endpoint first
-        direct_endpoint = f"{API_BASE_URL}/api/users"
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                direct_endpoint,
-                json=user_data
-            )
-            
-            if response.status_code in [200, 201]:
-                logger.info(f"✅ User created via direct endpoint: {user_data.get('username')}")
-                return response.json()
-            
-            # If direct endpoint fails, try the regular one with redirect handling
-            logger.info("🔄 Trying regular endpoint with redirect...")
-            return await create_user(user_data)
-            
+        return await _create(user_data, tuple(reversed(CREATE_ENDPOINTS)))
     except Exception as e:
         logger.error(f"❌ Error in create_user_direct: {e}")
         return None
@@ -161,14 +618,14 @@ async def create_user_direct(user_data: Dict[str, Any]) -> Optional[Dict]:
 async def check_api_health() -> bool:
     """Check if API is accessible"""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{API_BASE_URL}/health")
-            return response.status_code == 200
+        response = await _call("GET", "/health", timeout=10.0)
+        return response.status_code == 200
+    except CircuitOpenError:
+        return False
     except:
         try:
             # Try the root endpoint
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(API_BASE_URL)
-                return response.status_code < 500
+            response = await _request("GET", API_BASE_URL, timeout=10.0)
+            return response.status_code < 500
         except:
             return False
\ No newline at end of file
@@ -0,0 +1,90 @@
+# background.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Coroutine, Deque, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_CONCURRENCY = int(os.getenv("BACKGROUND_CONCURRENCY", "16"))
+BACKGROUND_MAX_PENDING = int(os.getenv("BACKGROUND_MAX_PENDING", "1000"))
+BACKGROUND_DRAIN_TIMEOUT = float(os.getenv("BACKGROUND_DRAIN_TIMEOUT", "10"))
+
+# Vercel freezes the function once the response is returned, so work left running after
+# that may never finish. In request-scoped runtimes the webhook drains before responding.
+REQUEST_SCOPED = os.getenv("REQUEST_SCOPED", "auto").lower()
+if REQUEST_SCOPED == "auto":
+    REQUEST_SCOPED = "on" if os.getenv("VERCEL") else "off"
+
+
+class BackgroundTasks:
+    """Runs side effects (admin notifications, refreshes) after the user has been answered"""
+
+    def __init__(self, concurrency: int = BACKGROUND_CONCURRENCY, max_pending: int = BACKGROUND_MAX_PENDING):
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.recent_errors: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    def spawn(self, coro: Coroutine, name: str = "task") -> Optional[asyncio.Task]:
+        """Schedule a coroutine; failures are logged and counted, never raised to the caller"""
+        if len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            coro.close()
+            logger.warning(f"⚠️ Background queue full ({self.max_pending}), dropping {name}")
+            return None
+        task = asyncio.create_task(self._run(coro, name), name=f"background:{name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.started += 1
+        return task
+
+    async def _run(self, coro: Coroutine, name: str) -> None:
+        async with self._semaphore:
+            try:
+                await coro
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                self.recent_errors.append({"task": name, "error": f"{type(e).__name__}: {e}", "at": time.time()})
+                logger.error(f"❌ Background task {name} failed: {e}")
+
+    async def drain(self, timeout: float = BACKGROUND_DRAIN_TIMEOUT) -> bool:
+        """Wait for everything scheduled so far (and anything it schedules); False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self._tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"⚠️ {len(self._tasks)} background tasks still running after {timeout:.0f}s")
+                return False
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+        return True
+
+    async def close(self, timeout: float = BACKGROUND_DRAIN_TIMEOUT) -> None:
+        """Drain on shutdown, cancelling whatever doesn't finish in time"""
+        if not await self.drain(timeout):
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "request_scoped": REQUEST_SCOPED == "on",
+            "running": len(self._tasks),
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "recent_errors": list(self.recent_errors),
+        }
+
+
+background = BackgroundTasks()
@@ -0,0 +1,73 @@
+# benchmarks/bench_api_client.py
+"""
+Compare backend call latency: a fresh httpx.AsyncClient per call (old behaviour)
+versus the shared pooled client from api_client.
+
+Usage:
+    python benchmarks/bench_api_client.py [--url URL] [--calls N] [--concurrency C]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api_client  # noqa: E402
+
+
+async def per_call_client(url: str) -> float:
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        await client.get(url)
+    return time.perf_counter() - start
+
+
+async def shared_client(url: str) -> float:
+    start = time.perf_counter()
+    await api_client.get_client().get(url)
+    return time.perf_counter() - start
+
+
+async def run(label: str, fn, url: str, calls: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> float:
+        async with semaphore:
+            return await fn(url)
+
+    wall_start = time.perf_counter()
+    samples = await asyncio.gather(*(one() for _ in range(calls)))
+    wall = time.perf_counter() - wall_start
+
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[max(0, int(len(samples_ms) * 0.95) - 1)]
+    print(
+        f"{label:<16} calls={calls:<5} mean={statistics.mean(samples_ms):8.1f}ms "
+        f"p50={statistics.median(samples_ms):8.1f}ms p95={p95:8.1f}ms wall={wall:6.2f}s"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=f"{api_client.API_BASE_URL}/health")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"🏁 Benchmarking {args.url}")
+    await run("per-call client", per_call_client, args.url, args.calls, args.concurrency)
+
+    await api_client.init_client()
+    # Warm the pool once so the shared run measures steady state
+    await api_client.get_client().get(args.url)
+    await run("shared client", shared_client, args.url, args.calls, args.concurrency)
+    await api_client.close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+# benchmarks/bench_json.py
+"""
+Decode cost per webhook update and per leaderboard payload size, for every JSON
+backend installed (stdlib json, orjson, msgspec), plus Update.de_json on top.
+
+Usage:
+    python benchmarks/bench_json.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fastjson  # noqa: E402
+
+SAMPLE_UPDATE = {
+    "update_id": 123456789,
+    "message": {
+        "message_id": 42,
+        "from": {"id": 111222333, "is_bot": False, "first_name": "Abebe", "username": "abebe", "language_code": "en"},
+        "chat": {"id": 111222333, "first_name": "Abebe", "username": "abebe", "type": "private"},
+        "date": 1760000000,
+        "text": "👥🏅 Leaderboard",
+    },
+}
+
+
+def leaderboard_payload(size: int) -> bytes:
+    board = [
+        {
+            "id": 100000 + i,
+            "username": f"player_{i}",
+            "score": 10 * (size - i),
+            "flags_level": 3,
+            "maps_level": 2,
+            "attires_level": 1,
+        }
+        for i in range(size)
+    ]
+    return json.dumps(board).encode()
+
+
+def available_backends():
+    backends = {"json": json.loads}
+    for name in ("orjson", "msgspec"):
+        try:
+            backends[name] = fastjson._load_backend(name)[0]
+        except ImportError:
+            pass
+    return backends
+
+
+def per_call_us(fn, repeat: int) -> float:
+    number = max(1, repeat)
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    print(f"🔧 fastjson default backend: {fastjson.BACKEND}")
+
+    update_bytes = json.dumps(SAMPLE_UPDATE).encode()
+    print(f"\n📨 Webhook update ({len(update_bytes)} bytes)")
+    for name, loads in backends.items():
+        print(f"  {name:<8} decode            {per_call_us(lambda: loads(update_bytes), args.repeat):8.2f} µs")
+
+    try:
+        from telegram import Bot, Update
+
+        bot = Bot("123:bench")
+        for name, loads in backends.items():
+            us = per_call_us(lambda: Update.de_json(loads(update_bytes), bot), args.repeat // 4)
+            print(f"  {name:<8} decode+de_json    {us:8.2f} µs")
+    except ImportError:
+        print("  (python-telegram-bot not installed, skipping Update.de_json)")
+
+    for size in (100, 1_000, 10_000, 100_000):
+        payload = leaderboard_payload(size)
+        repeat = max(1, args.repeat * 100 // size)
+        print(f"\n🏆 Leaderboard {size} players ({len(payload) / 1024:.0f} KiB)")
+        for name, loads in backends.items():
+            print(f"  {name:<8} decode {per_call_us(lambda: loads(payload), repeat) / 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost: import time, lifespan startup and time-to-first-update, measured in a
+fresh interpreter against local stand-ins for the Bot API and the backend. Runs a first
+boot (no webhook state) and a second boot (state file present) and counts Bot API calls.
+
+Usage:
+    python benchmarks/bench_startup.py [--boots N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_services import FakeServices  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t_ready = time.perf_counter()
+    update = {"update_id": 1, "message": {"message_id": 1, "date": 0, "text": "⚙️ Settings",
+              "chat": {"id": 4242, "type": "private"},
+              "from": {"id": 4242, "is_bot": False, "first_name": "Bench"}}}
+    response = client.post("/webhook", json=update)
+    t_first = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "lifespan_ms": (t_ready - t_import) * 1000,
+    "first_update_ms": (t_first - t_ready) * 1000,
+    "time_to_first_update_ms": (t_first - t0) * 1000,
+    "status": response.status_code,
+}))
+"""
+
+
+def boot(services: FakeServices, state_dir: str) -> dict:
+    env = dict(
+        os.environ,
+        BOT_TOKEN="123456:bench",
+        BOT_API_BASE_URL=services.url,
+        API_BASE_URL=services.url,
+        ENVIRONMENT="production",
+        WEBHOOK_URL="https://example.invalid/webhook",
+        WEBHOOK_STATE_PATH=os.path.join(state_dir, "webhook.json"),
+        PERSISTENCE_PATH=os.path.join(state_dir, "user_data.sqlite3"),
+        DEDUP_BACKEND="memory",
+    )
+    before = sum(services.calls.values())
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["bot_api_calls"] = sum(services.calls.values()) - before
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--boots", type=int, default=3)
+    args = parser.parse_args()
+
+    with FakeServices() as services, tempfile.TemporaryDirectory() as state_dir:
+        for i in range(args.boots):
+            label = "first boot" if i == 0 else f"warm boot {i}"
+            r = boot(services, state_dir)
+            print(
+                f"{label:<12} import={r['import_ms']:7.1f}ms lifespan={r['lifespan_ms']:7.1f}ms "
+                f"first_update={r['first_update_ms']:7.1f}ms total={r['time_to_first_update_ms']:7.1f}ms "
+                f"bot_api_calls={r['bot_api_calls']} status={r['status']}"
+            )
+        print(f"📊 Bot API calls by method: {dict(services.calls)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/fake_services.py
+"""
+Local stand-ins for the Telegram Bot API and the game backend, for benchmarks.
+
+Point the bot at it with BOT_API_BASE_URL=http://127.0.0.1:<port> and
+API_BASE_URL=http://127.0.0.1:<port>. Bot API calls are counted per method.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeServices:
+    def __init__(self, users: int = 1000, latency: float = 0.0, blocked: Optional[set] = None):
+        self.latency = latency
+        self.blocked = blocked or set()
+        self.calls: Counter = Counter()
+        self.sent: List[Dict] = []
+        self.users = [
+            {"id": 100000 + i, "username": f"player_{i}", "phone": "", "score": 10 * (users - i)}
+            for i in range(users)
+        ]
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        # Clients that cancel mid-request (interrupted benchmarks) aren't worth a traceback
+        self._server.handle_error = lambda request, client_address: None
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeServices":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def bot_api(self, method: str, params: Dict) -> Dict:
+        with self._lock:
+            self.calls[method] += 1
+        chat_id = params.get("chat_id")
+        if method in ("sendMessage", "sendGame", "editMessageText"):
+            if chat_id is not None and int(chat_id) in self.blocked:
+                return {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+            with self._lock:
+                self.sent.append({"method": method, **params})
+            return {"ok": True, "result": {
+                "message_id": len(self.sent), "date": int(time.time()),
+                "chat": {"id": int(chat_id or 0), "type": "private"}, "text": params.get("text", ""),
+            }}
+        if method == "getMe":
+            return {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Gomida", "username": "gomida_bench_bot"}}
+        if method == "getWebhookInfo":
+            return {"ok": True, "result": {"url": "", "has_custom_certificate": False, "pending_update_count": 0}}
+        return {"ok": True, "result": True}
+
+    def backend(self, verb: str, path: str, query: Dict) -> tuple:
+        parts = [p for p in path.split("/") if p]
+        if parts == ["users", "leaderboard"]:
+            return 200, self.users
+        if parts == ["users"] and verb == "GET":
+            offset, limit = int(query.get("offset", ["0"])[0]), int(query.get("limit", ["100"])[0])
+            return 200, self.users[offset:offset + limit]
+        if len(parts) == 2 and parts[0] == "users":
+            return 200, {"id": int(parts[1]), "username": f"user_{parts[1]}", "phone": "+251900000000", "score": 0}
+        if parts == ["health"]:
+            return 200, {"status": "ok"}
+        return 404, {"detail": "Not Found"}
+
+    def _handler_class(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _respond(self, status: int, payload) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _params(self) -> Dict:
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if not raw:
+                    return {}
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    return json.loads(raw)
+                return {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+
+            def _handle(self, verb: str) -> None:
+                if services.latency:
+                    time.sleep(services.latency)
+                parsed = urlparse(self.path)
+                if parsed.path.startswith("/bot"):
+                    method = parsed.path.rsplit("/", 1)[-1]
+                    payload = services.bot_api(method, self._params())
+                    self._respond(200 if payload["ok"] else payload["error_code"], payload)
+                else:
+                    self._params()
+                    status, payload = services.backend(verb, parsed.path, parse_qs(parsed.query))
+                    self._respond(status, payload)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+        return Handler
@@ -1,15 +1,10 @@
 # bot_setup.py
 import os
 import logging
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ConversationHandler
+from typing import Optional
+from telegram.ext import Application
 from dotenv import load_dotenv
-from commands import groupid, notify_test, start, stop, refresh
-from callbacks import handle_message_response, handle_contact_shared, handle_callback_query
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
@@ -20,27 +15,99 @@ if not BOT_TOKEN:
 
 print(f"✅ Bot token loaded: {BOT_TOKEN[:10]}...")
 
-# Create Telegram application
-application = Application.builder().token(BOT_TOKEN).build()
+# Pace outbound Bot API requests ("off" to send unthrottled)
+RATE_LIMITER = os.getenv("RATE_LIMITER", "on").lower()
 
-# Add command handlers
-application.add_handler(CommandHandler("start", start))
-application.add_handler(CommandHandler("stop", stop))
-application.add_handler(CommandHandler("refresh", refresh))
+# Point the bot at a different Bot API server (local Bot API server or a test stand-in)
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL", "")
 
-# Add conversation handler
-conv_handler = ConversationHandler(
-    entry_points=[CommandHandler("start", start)],
-    states={},
-    fallbacks=[CommandHandler("stop", stop)],
-)
+_application: Optional[Application] = None
 
-application.add_handler(conv_handler)
+async def _flush_notifications(_: Application) -> None:
+    """Checkpoint any broadcast, finish side effects and send the pending admin digest (polling mode)"""
+    from background import background
+    from broadcast import stop_broadcast
+    from notifications import notification_digest
+    await stop_broadcast()
+    await background.close()
+    await notification_digest.close()
 
-# Add message handlers
-application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message_response))
-application.add_handler(MessageHandler(filters.CONTACT, handle_contact_shared))
-application.add_handler(CallbackQueryHandler(handle_callback_query))
-application.add_handler(CommandHandler("notifytest", notify_test))
+async def _close_backend(_: Application) -> None:
+    """Flush buffered user updates and release pooled backend connections when polling stops"""
+    from api_client import close_client
+    from write_behind import user_writes
+    await user_writes.close()
+    await close_client()
 
-print("✅ Gomida Games Bot setup complete!")
\ No newline at end of file
+def build_application() -> Application:
+    """Create the Telegram application and register handlers"""
+    # Handler modules pull in api_client, caches and renderers, so only import them when building
+    from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler, ConversationHandler
+    from commands import groupid, notify_test, start, stop, refresh, get_admin_group_id
+    from commands import broadcast, broadcast_resume, broadcast_status
+    from callbacks import handle_message_response, handle_contact_shared, handle_callback_query
+    from dispatcher import PerUserUpdateProcessor
+    from metrics import TimedHTTPXRequest
+    from persistence import create_persistence
+    from rate_limiter import PriorityRateLimiter
+
+    # Create Telegram application
+    # Updates from different users run concurrently, each user's updates stay in order
+    update_processor = PerUserUpdateProcessor()
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(update_processor)
+        # Same pool size as PTB's default transport, with per-method latency metrics
+        .request(TimedHTTPXRequest(connection_pool_size=256))
+        .post_stop(_flush_notifications)
+        .post_shutdown(_close_backend)
+    )
+    if RATE_LIMITER != "off":
+        # Global + per-chat buckets; user replies are served before admin-group traffic
+        builder = builder.rate_limiter(PriorityRateLimiter(admin_chat_id=get_admin_group_id()))
+    if BOT_API_BASE_URL:
+        base_url = BOT_API_BASE_URL.rstrip("/")
+        builder = builder.base_url(f"{base_url}/bot").base_file_url(f"{base_url}/file/bot")
+
+    # Keep user_data (api_user, contact_shared) across restarts
+    persistence = create_persistence()
+    if persistence:
+        # Don't unload the user_data of users whose updates are still running
+        persistence.is_busy = update_processor.user_busy
+        builder = builder.persistence(persistence)
+
+    application = builder.build()
+
+    # Add command handlers
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("stop", stop))
+    application.add_handler(CommandHandler("refresh", refresh))
+
+    # Add conversation handler
+    conv_handler = ConversationHandler(
+        entry_points=[CommandHandler("start", start)],
+        states={},
+        fallbacks=[CommandHandler("stop", stop)],
+    )
+
+    application.add_handler(conv_handler)
+
+    # Add message handlers
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message_response))
+    application.add_handler(MessageHandler(filters.CONTACT, handle_contact_shared))
+    application.add_handler(CallbackQueryHandler(handle_callback_query))
+    application.add_handler(CommandHandler("notifytest", notify_test))
+    application.add_handler(CommandHandler("broadcast", broadcast))
+    application.add_handler(CommandHandler("broadcast_resume", broadcast_resume))
+    application.add_handler(CommandHandler("broadcast_status", broadcast_status))
+
+    print("✅ Gomida Games Bot setup complete!")
+    return application
+
+def get_application() -> Application:
+    """Build the application on first use and reuse it afterwards"""
+    global _application
+    if _application is None:
+        _application = build_application()
+    return _application
@@ -0,0 +1,217 @@
+# broadcast.py
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+from telegram.error import BadRequest, Forbidden, TelegramError
+
+from api_client import list_users
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_DB_PATH = os.getenv("BROADCAST_DB_PATH", "/tmp/gomida_broadcasts.sqlite3")
+# Users fetched from the backend per page; progress is checkpointed after every page
+BROADCAST_PAGE_SIZE = int(os.getenv("BROADCAST_PAGE_SIZE", "200"))
+# Sends in flight at once; the rate limiter keeps the actual rate within Bot API limits
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "30"))
+
+
+class BroadcastStore:
+    """Broadcast jobs and their progress, so a crashed broadcast resumes where it stopped"""
+
+    def __init__(self, path: str = BROADCAST_DB_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS broadcasts ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " text TEXT NOT NULL,"
+            " parse_mode TEXT,"
+            " status TEXT NOT NULL DEFAULT 'running',"
+            " next_offset INTEGER NOT NULL DEFAULT 0,"
+            " sent INTEGER NOT NULL DEFAULT 0,"
+            " failed INTEGER NOT NULL DEFAULT 0,"
+            " blocked INTEGER NOT NULL DEFAULT 0,"
+            " elapsed REAL NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL)"
+        )
+
+    def create(self, text: str, parse_mode: Optional[str]) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO broadcasts (text, parse_mode, created_at) VALUES (?, ?, ?)", (text, parse_mode, time.time())
+        )
+        return cursor.lastrowid
+
+    def get(self, broadcast_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_unfinished(self) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT * FROM broadcasts WHERE status IN ('running', 'interrupted') ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        return dict(row) if row else None
+
+    def checkpoint(self, job: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "UPDATE broadcasts SET status = ?, next_offset = ?, sent = ?, failed = ?, blocked = ?, elapsed = ? WHERE id = ?",
+            (job['status'], job['next_offset'], job['sent'], job['failed'], job['blocked'], job['elapsed'], job['id']),
+        )
+
+
+class BroadcastEngine:
+    """Sends one message to every registered user, paging through the backend"""
+
+    def __init__(self, bot, store: BroadcastStore, concurrency: int = BROADCAST_CONCURRENCY, page_size: int = BROADCAST_PAGE_SIZE):
+        self.bot = bot
+        self.store = store
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.current: Optional[Dict[str, Any]] = None
+        # Route through the rate limiter's bulk lane so user replies keep priority
+        self._send_kwargs = {"rate_limit_args": {"lane": "bulk"}} if getattr(bot, "rate_limiter", None) else {}
+
+    @property
+    def running(self) -> bool:
+        return self.current is not None and self.current['status'] == 'running'
+
+    async def _send_one(self, job: Dict[str, Any], chat_id: int, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                await self.bot.send_message(
+                    chat_id=chat_id, text=job['text'], parse_mode=job['parse_mode'], **self._send_kwargs
+                )
+                job['sent'] += 1
+            except Forbidden:
+                # User blocked the bot or deleted their account
+                job['blocked'] += 1
+            except BadRequest as e:
+                job['failed'] += 1
+                logger.info(f"ℹ️ Broadcast {job['id']} skipped chat {chat_id}: {e}")
+            except TelegramError as e:
+                job['failed'] += 1
+                logger.warning(f"⚠️ Broadcast {job['id']} failed for chat {chat_id}: {e}")
+
+    async def run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Run (or resume) a broadcast job until every user page has been sent"""
+        job['status'] = 'running'
+        self.current = job
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.monotonic() - job['elapsed']
+        logger.info(f"📣 Broadcast {job['id']} starting at offset {job['next_offset']}")
+
+        previous_ids = None
+        try:
+            while True:
+                users = await list_users(job['next_offset'], self.page_size)
+                if users is None:
+                    raise RuntimeError(f"could not list users at offset {job['next_offset']}")
+                if not users:
+                    break
+
+                # A backend that ignores the offset serves the same full page forever
+                page_ids = [user.get('id') for user in users]
+                if page_ids == previous_ids:
+                    logger.warning(
+                        f"⚠️ Broadcast {job['id']}: backend returned the same users at offset "
+                        f"{job['next_offset']}, it doesn't seem to page /users; stopping"
+                    )
+                    break
+                previous_ids = page_ids
+
+                await asyncio.gather(*(
+                    self._send_one(job, user['id'], semaphore) for user in users if user.get('id')
+                ))
+                job['next_offset'] += len(users)
+                job['elapsed'] = time.monotonic() - started
+                self.store.checkpoint(job)
+
+                if len(users) < self.page_size:
+                    break
+
+            job['status'] = 'done'
+        except asyncio.CancelledError:
+            job['status'] = 'interrupted'
+            raise
+        except Exception as e:
+            job['status'] = 'interrupted'
+            logger.error(f"❌ Broadcast {job['id']} interrupted at offset {job['next_offset']}: {e}")
+        finally:
+            job['elapsed'] = time.monotonic() - started
+            self.store.checkpoint(job)
+
+        logger.info(f"📣 Broadcast {job['id']} {job['status']}: {format_report(job)}")
+        return job
+
+
+def format_report(job: Dict[str, Any]) -> str:
+    attempted = job['sent'] + job['failed'] + job['blocked']
+    rate = attempted / job['elapsed'] if job['elapsed'] else 0.0
+    return (
+        f"sent {job['sent']}, blocked {job['blocked']}, failed {job['failed']} "
+        f"in {job['elapsed']:.1f}s ({rate:.1f} msg/s)"
+    )
+
+
+_store: Optional[BroadcastStore] = None
+_engine: Optional[BroadcastEngine] = None
+_task: Optional[asyncio.Task] = None
+
+
+def get_engine(bot) -> BroadcastEngine:
+    global _store, _engine
+    if _engine is None:
+        _store = BroadcastStore()
+        _engine = BroadcastEngine(bot, _store)
+    return _engine
+
+
+async def start_broadcast(bot, text: str, parse_mode: Optional[str] = None, on_done=None) -> Dict[str, Any]:
+    """Create a broadcast job and run it in the background"""
+    engine = get_engine(bot)
+    broadcast_id = engine.store.create(text, parse_mode)
+    job = engine.store.get(broadcast_id)
+    _launch(engine, job, on_done)
+    return job
+
+
+async def resume_broadcast(bot, on_done=None) -> Optional[Dict[str, Any]]:
+    """Continue the most recent broadcast that didn't finish"""
+    engine = get_engine(bot)
+    job = engine.store.latest_unfinished()
+    if job:
+        _launch(engine, job, on_done)
+    return job
+
+
+def _launch(engine: BroadcastEngine, job: Dict[str, Any], on_done) -> None:
+    global _task
+
+    async def runner():
+        finished = await engine.run(job)
+        if on_done:
+            await on_done(finished)
+
+    _task = asyncio.create_task(runner())
+
+
+def broadcast_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def current_broadcast() -> Optional[Dict[str, Any]]:
+    return _engine.current if _engine else None
+
+
+async def stop_broadcast() -> None:
+    """Cancel a running broadcast on shutdown; it is checkpointed as interrupted"""
+    if broadcast_running():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
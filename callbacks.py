@@ -1,15 +1,95 @@
 # callbacks.py
-from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import CallbackContext
 from docs import TERMS_AND_SERVICES
-from games import games
+from games import PLAY_MENU_MODE, catalog
 from urllib.parse import quote
 from buttons import unlocked_menu_markup, initial_menu_markup, regular_menu_markup
-from api_client import update_user, create_user, get_leaderboard
+from api_client import queue_user_update, create_user, get_leaderboard_page, get_user_rank, peek_user
+from leaderboard_view import (
+    LEADERBOARD_PAGE_SIZE, LEADERBOARD_AROUND_RANGE,
+    render_leaderboard, render_around, render_digest,
+)
+from deadlines import PENDING, within_budget
+from background import background
+from dispatcher import in_user_order
+from persistence import api_user_is_stale, remember_api_user
+from game_links import launch_url
+from telegram.error import BadRequest, Forbidden
 import html
+import logging
 
-# Constants for leaderboard pagination
-LEADERBOARD_PAGE_SIZE = 15  # Users per page (increased from 10)
+logger = logging.getLogger(__name__)
+
+async def ensure_api_user(context: CallbackContext, user) -> None:
+    """Load (or create) the backend profile into user_data, within the profile budget"""
+    if not api_user_is_stale(context.user_data):
+        return
+    
+    from api_client import get_user_by_tg_id, create_user
+    existing_user = await within_budget("profile", get_user_by_tg_id(user.id))
+    
+    if existing_user is PENDING:
+        # Backend is slow: answer with defaults now, the late read still fills the profile cache
+        return
+    
+    if not existing_user:
+        # Create new user
+        user_data = {
+            "id": user.id,
+            "username": user.username or f"user_{user.id}",
+            "phone": "",
+            "score": 0,
+            "flags_level": 1,
+            "maps_level": 1,
+            "attires_level": 1,
+            "flags_stars": {},
+            "maps_stars": {},
+            "attires_stars": {}
+        }
+        existing_user = await create_user(user_data)
+    
+    # An update handled while we waited may have loaded (or changed) the profile already
+    if existing_user and api_user_is_stale(context.user_data):
+        remember_api_user(context.user_data, existing_user)
+        context.user_data['contact_shared'] = (
+            context.user_data.get('contact_shared', False) or bool(existing_user.get('phone'))
+        )
+
+def cached_rank_info(user_id: int):
+    """Rank from the leaderboard snapshot we already hold (possibly stale), without a backend call"""
+    from leaderboard import leaderboard_cache
+    
+    snapshot = leaderboard_cache.snapshot
+    entry = snapshot.entry_for(user_id) if snapshot else None
+    if entry is None:
+        return None
+    return {"rank": snapshot.rank_of(user_id), "score": entry.get('score', 0), "total": len(snapshot)}
+
+async def send_play_menu(update: Update, context: CallbackContext):
+    """Offer every game in the catalog, as game messages or as one compact menu"""
+    user = update.effective_user
+    games = catalog.games
+    
+    if PLAY_MENU_MODE == "menu":
+        # One message; each button opens the game with the player's details already filled in
+        api_user = context.user_data.get('api_user') or peek_user(user.id)
+        keyboard = [
+            [InlineKeyboardButton(f"🎮 {game['name']}", web_app=WebAppInfo(url=launch_url(game['short_name'], user, api_user)))]
+            for game in games
+        ]
+        await update.message.reply_text("🎮 Pick a game:", reply_markup=InlineKeyboardMarkup(keyboard))
+        return
+    
+    # One at a time, in catalog order; the rate limiter paces them for this chat
+    for game in games:
+        try:
+            await update.message.reply_game(game_short_name=game["short_name"])
+        except Forbidden as e:
+            logger.warning(f"⚠️ Stopped sending games to {user.id}: {e}")
+            return
+        except Exception as e:
+            logger.error(f"❌ Could not send game {game['short_name']} to {user.id}: {e}")
 
 async def handle_message_response(update: Update, context: CallbackContext):
     text = update.message.text
@@ -21,30 +101,7 @@ async def handle_message_response(update: Update, context: CallbackContext):
         return
     
     # Ensure user exists in context
-    if 'api_user' not in context.user_data:
-        # Try to get existing user or create new one
-        from api_client import get_user_by_tg_id, create_user
-        existing_user = await get_user_by_tg_id(user.id)
-        
-        if not existing_user:
-            # Create new user
-            user_data = {
-                "id": user.id,
-                "username": user.username or f"user_{user.id}",
-                "phone": "",
-                "score": 0,
-                "flags_level": 1,
-                "maps_level": 1,
-                "attires_level": 1,
-                "flags_stars": {},
-                "maps_stars": {},
-                "attires_stars": {}
-            }
-            existing_user = await create_user(user_data)
-        
-        if existing_user:
-            context.user_data['api_user'] = existing_user
-            context.user_data['contact_shared'] = bool(existing_user.get('phone'))
+    await ensure_api_user(context, user)
     
     if text == "👤 Account":
         api_user = context.user_data.get('api_user', {})
@@ -53,19 +110,21 @@ async def handle_message_response(update: Update, context: CallbackContext):
         first_name = user.first_name
         last_name = user.last_name or ''
         username = user.username or "No username"
-        score = api_user.get('score', 0)
+        # Profile still loading (slow backend): don't show zeros as if they were real
+        score = f"{api_user.get('score', 0)} points" if api_user else "updating…"
         flags_level = api_user.get('flags_level', 1)
         maps_level = api_user.get('maps_level', 1)
         attires_level = api_user.get('attires_level', 1)
         
         # Get user's rank if available
         rank = "N/A"
-        leaderboard_data = await get_leaderboard()
-        if leaderboard_data:
-            for i, lb_user in enumerate(leaderboard_data, 1):
-                if lb_user.get('id') == user.id:
-                    rank = f"#{i}"
-                    break
+        rank_info = await within_budget("account", get_user_rank(user.id))
+        if rank_info is PENDING:
+            # Don't hold the reply for a slow backend: use the last snapshot or say it's coming
+            rank_info = cached_rank_info(user.id)
+            rank = f"#{rank_info['rank']}" if rank_info else "updating…"
+        elif rank_info:
+            rank = f"#{rank_info['rank']}"
         
         account_info = (
             f"👤 <b>Your Account Info</b>\n\n"
@@ -73,7 +132,7 @@ async def handle_message_response(update: Update, context: CallbackContext):
             f"• <b>Username:</b> @{html.escape(username)}\n"
             f"• <b>Phone:</b> <code>{html.escape(phone)}</code>\n"
             f"• <b>Global Rank:</b> {rank}\n"
-            f"• <b>Score:</b> {score} points\n"
+            f"• <b>Score:</b> {score}\n"
             f"• <b>Contact Shared:</b> {'✅ Yes' if context.user_data.get('contact_shared') else '❌ No'}"
         )
         
@@ -89,9 +148,7 @@ async def handle_message_response(update: Update, context: CallbackContext):
                 reply_markup=regular_menu_markup
             )
         
-        # Send each game using Telegram's Game API
-        for game in games:
-            await update.message.reply_game(game_short_name=game["short_name"])
+        await send_play_menu(update, context)
     
     elif text == "✉️ Invite":
         # Jump directly to contact sharing
@@ -128,105 +185,110 @@ async def handle_message_response(update: Update, context: CallbackContext):
                 reply_markup=regular_menu_markup
             )
 
+async def fetch_leaderboard_page(page: int):
+    """Fetch one leaderboard page, clamping the page number to the board size"""
+    page = max(1, page)
+    page_data = await get_leaderboard_page((page - 1) * LEADERBOARD_PAGE_SIZE, LEADERBOARD_PAGE_SIZE)
+    if page_data is None:
+        return None
+    
+    if page_data['total'] is None:
+        # Size unknown (backend pages without a total): step back from an empty page past the end
+        if page > 1 and not page_data['entries']:
+            page -= 1
+            page_data = await get_leaderboard_page((page - 1) * LEADERBOARD_PAGE_SIZE, LEADERBOARD_PAGE_SIZE)
+            if page_data is None:
+                return None
+        page_data['page'] = page
+        page_data['total_pages'] = None
+        return page_data
+    
+    total_pages = max(1, (page_data['total'] + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE)
+    if page > total_pages:
+        # Board shrank (or a stale button) - show the last page instead
+        page = total_pages
+        page_data = await get_leaderboard_page((page - 1) * LEADERBOARD_PAGE_SIZE, LEADERBOARD_PAGE_SIZE)
+        if page_data is None:
+            return None
+    
+    page_data['page'] = page
+    page_data['total_pages'] = total_pages
+    page_data['has_more'] = page < total_pages
+    return page_data
+
+def cached_leaderboard_page(page: int):
+    """Build a page from the snapshot we already hold, None if there isn't one"""
+    from leaderboard import leaderboard_cache
+    
+    snapshot = leaderboard_cache.snapshot
+    if snapshot is None:
+        return None
+    total_pages = max(1, (len(snapshot) + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE)
+    page = min(max(1, page), total_pages)
+    offset = (page - 1) * LEADERBOARD_PAGE_SIZE
+    return {
+        "entries": snapshot.entries[offset:offset + LEADERBOARD_PAGE_SIZE],
+        "total": len(snapshot),
+        "has_more": page < total_pages,
+        "offset": offset,
+        "version": snapshot.version,
+        "page": page,
+        "total_pages": total_pages,
+    }
+
+async def build_leaderboard(context: CallbackContext, page: int):
+    """Fetch a page plus the caller's rank and render it, None if the backend is unavailable"""
+    page_data = await within_budget("leaderboard", fetch_leaderboard_page(page))
+    if page_data is PENDING:
+        page_data = cached_leaderboard_page(page)
+    if page_data is None:
+        return None
+    
+    current_user = context.user_data.get('api_user', {})
+    rank_info = None
+    if current_user.get('id'):
+        rank_info = await within_budget("leaderboard_rank", get_user_rank(current_user['id']))
+        if rank_info is PENDING:
+            rank_info = cached_rank_info(current_user['id'])
+    return render_leaderboard(page_data, current_user, rank_info)
+
+def _remember_render(context: CallbackContext, message_id: int, text: str, reply_markup) -> None:
+    context.user_data['leaderboard_render'] = {
+        'message_id': message_id,
+        'digest': render_digest(text, reply_markup),
+    }
+
+async def _edit_leaderboard_message(query, context: CallbackContext, text: str, reply_markup) -> None:
+    """Edit the leaderboard message, skipping the round trip when nothing would change"""
+    last = context.user_data.get('leaderboard_render') or {}
+    message_id = query.message.message_id if query.message else None
+    digest = render_digest(text, reply_markup)
+    if message_id is not None and last.get('message_id') == message_id and last.get('digest') == digest:
+        return
+    
+    try:
+        await query.edit_message_text(text, parse_mode='HTML', reply_markup=reply_markup)
+    except BadRequest as e:
+        # Someone else's render (or a lost digest) already shows this exact content
+        if "not modified" not in str(e).lower():
+            raise
+    
+    if message_id is not None:
+        _remember_render(context, message_id, text, reply_markup)
+
 async def show_leaderboard(update: Update, context: CallbackContext, page: int = 1):
     """Display paginated leaderboard from API"""
     # Show loading message
     loading_msg = await update.message.reply_text("🏆 Fetching leaderboard...")
     
-    # Get leaderboard data from API
-    leaderboard_data = await get_leaderboard()
-    
-    if not leaderboard_data:
+    rendered = await build_leaderboard(context, page)
+    if rendered is None:
         await loading_msg.edit_text("❌ Could not load leaderboard. Please try again later.")
         return
     
-    if not leaderboard_data:  # Empty list
-        await loading_msg.edit_text("🏆 Leaderboard is empty. Be the first to score points!")
-        return
-    
-    total_users = len(leaderboard_data)
-    total_pages = (total_users + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE
-    
-    # Ensure page is within valid range
-    page = max(1, min(page, total_pages))
-    
-    # Calculate start and end indices for current page
-    start_idx = (page - 1) * LEADERBOARD_PAGE_SIZE
-    end_idx = min(start_idx + LEADERBOARD_PAGE_SIZE, total_users)
-    
-    # Format leaderboard header
-    leaderboard_text = f"<b>🏆 Global Leaderboard</b>\n"
-    leaderboard_text += f"<i>Page {page}/{total_pages} • {total_users} players</i>\n\n"
-    
-    # Emojis for positions
-    position_emojis = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
-    
-    for i in range(start_idx, end_idx):
-        user = leaderboard_data[i]
-        username = user.get('username', 'Unknown')
-        score = user.get('score', 0)
-        position = i + 1
-        
-        # Truncate long usernames
-        if len(username) > 15:
-            username = username[:12] + "..."
-        
-        # Get appropriate emoji for position
-        if position <= 10:
-            position_emoji = position_emojis[position - 1]
-        else:
-            position_emoji = f"{position}."
-        
-        # Highlight current user
-        current_user = context.user_data.get('api_user', {})
-        is_current_user = user.get('id') == current_user.get('id')
-        
-        if is_current_user:
-            leaderboard_text += f"{position_emoji} <b>{username} - {score} pts 👈 YOU</b>\n"
-        else:
-            leaderboard_text += f"{position_emoji} {username} - {score} pts\n"
-    
-    # Add user's own position if not on current page
-    current_user = context.user_data.get('api_user', {})
-    if current_user:
-        user_id = current_user.get('id')
-        user_score = current_user.get('score', 0)
-        
-        # Find user's position in leaderboard
-        user_position = None
-        for i, user in enumerate(leaderboard_data):
-            if user.get('id') == user_id:
-                user_position = i + 1
-                break
-        
-        if user_position and (user_position < start_idx + 1 or user_position > end_idx):
-            leaderboard_text += f"\n<b>Your Position:</b> #{user_position} - {user_score} pts"
-    
-    # Add footer
-    leaderboard_text += "\nPlay more games to climb the ranks! 🎮"
-    
-    # Create pagination buttons
-    keyboard = []
-    
-    # Previous button (only if not on first page)
-    if page > 1:
-        keyboard.append(InlineKeyboardButton("◀️ Previous", callback_data=f"leaderboard_page_{page-1}"))
-    
-    # Refresh button
-    keyboard.append(InlineKeyboardButton("🔄 Refresh", callback_data=f"leaderboard_page_{page}"))
-    
-    # Next button (only if not on last page)
-    if page < total_pages:
-        keyboard.append(InlineKeyboardButton("Next ▶️", callback_data=f"leaderboard_page_{page+1}"))
-    
-    # Add jump to my position button if user is in leaderboard
-    if current_user and user_position:
-        keyboard.append(InlineKeyboardButton("📍 My Rank", callback_data=f"leaderboard_jump_{user_position}"))
-    
-    reply_markup = InlineKeyboardMarkup([keyboard]) if keyboard else None
-    
-    # Edit the loading message with leaderboard
-    await loading_msg.edit_text(leaderboard_text, parse_mode='HTML', reply_markup=reply_markup)
+    text, reply_markup = rendered
+    await loading_msg.edit_text(text, parse_mode='HTML', reply_markup=reply_markup)
+    _remember_render(context, loading_msg.message_id, text, reply_markup)
 
 async def jump_to_contact_invite(update: Update, context: CallbackContext):
     """Jump directly to contact selection for inviting"""
@@ -317,7 +379,7 @@ async def handle_contact_selection(update: Update, context: CallbackContext):
                 reply_markup=regular_menu_markup
             )
 
-from commands import send_registration_notification
+from commands import notify_in_background
 
 async def handle_contact_shared(update: Update, context: CallbackContext):
     """Handle when user shares their contact"""
@@ -328,41 +390,26 @@ async def handle_contact_shared(update: Update, context: CallbackContext):
     context.user_data['contact_shared'] = True
     context.user_data['user_phone'] = contact.phone_number
     
-    # Update user in backend API
-    api_user = context.user_data.get('api_user', {})
-    user_id = api_user.get('id', user.id)
-    
+    # Only what Telegram just told us: progress fields are never written from a local copy
     update_data = {
-        "id": user_id,
-        "username": api_user.get('username') or user.username or f"user_{user.id}",
+        "phone": contact.phone_number,
         "first_name": user.first_name or "",
         "last_name": user.last_name or "",
-        "phone": contact.phone_number,
-        "score": api_user.get('score', 0),
-        "flags_level": api_user.get('flags_level', 1),
-        "maps_level": api_user.get('maps_level', 1),
-        "attires_level": api_user.get('attires_level', 1),
-        "flags_stars": api_user.get('flags_stars', {}),
-        "maps_stars": api_user.get('maps_stars', {}),
-        "attires_stars": api_user.get('attires_stars', {})
     }
+    if user.username:
+        update_data["username"] = user.username
     
-    # Call API to update user
-    updated_user = await update_user(user_id, update_data)
+    # Buffered write; the returned document is the server copy with the new phone applied
+    updated_user = await queue_user_update(user.id, update_data)
     api_success = bool(updated_user)
     
+    api_user = context.user_data.get('api_user')
     if updated_user:
-        context.user_data['api_user'] = updated_user
-    else:
-        # Fallback: use update_data if API failed
-        context.user_data['api_user'] = update_data
-    
-    # ✅ Send notification to admin group about contact update
-    await send_registration_notification(
-        bot=context.bot,
-        new_user=context.user_data['api_user'],
-        context={'contact_shared': True, 'api_response': api_success}
-    )
+        remember_api_user(context.user_data, updated_user)
+    elif api_user:
+        # No server copy to apply it to yet: show the phone, but re-read the profile next time
+        context.user_data['api_user'] = {**api_user, **update_data}
+        context.user_data.pop('api_user_fetched_at', None)
     
     await update.message.reply_text(
         f"✅ Thank you {contact.first_name}!\n\n"
@@ -370,6 +417,13 @@ async def handle_contact_shared(update: Update, context: CallbackContext):
         "You now have access to all features!",
         reply_markup=unlocked_menu_markup
     )
+    
+    # ✅ Send notification to admin group about contact update
+    notify_in_background(
+        context.bot,
+        context.user_data.get('api_user') or {"id": user.id, **update_data},
+        {'contact_shared': True, 'api_response': api_success}
+    )
 
 async def handle_callback_query(update: Update, context: CallbackContext):
     """Handle callback queries for games, leaderboard pagination, and back to menu"""
@@ -400,79 +454,24 @@ async def handle_callback_query(update: Update, context: CallbackContext):
     
     # For Telegram Game API, the callback contains game_short_name
     if query.game_short_name:
-        # Find the game in your games list
-        game_data = next((g for g in games if g["short_name"] == query.game_short_name), None)
+        user = update.effective_user
         
-        if game_data:
-            # Get user information
-            user = update.effective_user
-            
-            # Ensure user exists in context
-            if 'api_user' not in context.user_data:
-                # Create or get user
-                from api_client import get_user_by_tg_id, create_user
-                existing_user = await get_user_by_tg_id(user.id)
-                
-                if not existing_user:
-                    user_data = {
-                        "id": user.id,
-                        "username": user.username or f"user_{user.id}",
-                        "phone": "",
-                        "score": 0,
-                        "flags_level": 1,
-                        "maps_level": 1,
-                        "attires_level": 1,
-                        "flags_stars": {},
-                        "maps_stars": {},
-                        "attires_stars": {}
-                    }
-                    existing_user = await create_user(user_data)
-                
-                if existing_user:
-                    context.user_data['api_user'] = existing_user
-                    context.user_data['contact_shared'] = bool(existing_user.get('phone'))
-            
-            # Create URL parameters with user data
-            api_user = context.user_data.get('api_user', {})
-            user_params = {
-                'tg_user_id': str(user.id),
-                'tg_first_name': user.first_name or '',
-                'tg_last_name': user.last_name or '',
-                'tg_username': user.username or '',
-                'tg_language': user.language_code or 'en',
-                'user_score': str(api_user.get('score', 0)),
-                'user_id': str(api_user.get('id', user.id)),
-            }
-            
-            # Add game progress data
-            user_params['flags_level'] = str(api_user.get('flags_level', 1))
-            user_params['maps_level'] = str(api_user.get('maps_level', 1))
-            user_params['attires_level'] = str(api_user.get('attires_level', 1))
-            
-            # Add phone if available
-            if api_user.get('phone'):
-                user_phone = api_user['phone']
-                print(f"📱 Sending phone to game: {user_phone}")
-                user_params['phone'] = user_phone
-            
-            # Build query string (only include non-empty values)
-            query_parts = []
-            for key, value in user_params.items():
-                if value:  # Skip empty values
-                    query_parts.append(f"{key}={quote(str(value))}")
-            
-            # Add game identifier
-            query_parts.append(f"game={game_data['short_name']}")
-            
-            # Build the final URL
-            if query_parts:
-                game_url = f"{game_data['url']}?{'&'.join(query_parts)}"
-            else:
-                game_url = game_data['url']
-            
-            # Answer the callback query with the game URL
-            print("Answered game callback with URL:", game_url)
+        # Telegram wants the answer fast: build the URL from the update and any profile we
+        # already hold, answer, and only then sync the profile with the backend
+        api_user = context.user_data.get('api_user') or peek_user(user.id)
+        game_url = launch_url(query.game_short_name, user, api_user)
+        
+        if game_url:
             await query.answer(url=game_url)
+            catalog.record_launch(query.game_short_name)
+            print("Answered game callback for:", query.game_short_name)
+            
+            if api_user_is_stale(context.user_data):
+                # Runs after this update and before the user's next one, like any handler
+                background.spawn(
+                    in_user_order(context.application, user.id, ensure_api_user(context, user)),
+                    name="profile_sync",
+                )
         else:
             await query.answer(text="Game not found!", show_alert=True)
             print("No game data found for short name:", query.game_short_name)
@@ -500,102 +499,58 @@ async def handle_leaderboard_callback(update: Update, context: CallbackContext):
         # Jump to page containing user's position
         try:
             position = int(data.split("_")[-1])
+            # Prefer the user's current rank over the one baked into the button
+            rank_info = await within_budget("leaderboard_rank", get_user_rank(update.effective_user.id), default=None)
+            if rank_info:
+                position = rank_info['rank']
             page = ((position - 1) // LEADERBOARD_PAGE_SIZE) + 1
             await show_leaderboard_callback(query, context, page)
             # Acknowledge the callback after editing the leaderboard
             await query.answer()
         except (ValueError, IndexError):
             await query.answer("Could not find your position!", show_alert=True)
+    
+    elif data == "leaderboard_around":
+        await show_leaderboard_around(query, context)
+        await query.answer()
 
 async def show_leaderboard_callback(query, context: CallbackContext, page: int = 1):
     """Update leaderboard message for callback queries"""
-    # Get leaderboard data from API
-    leaderboard_data = await get_leaderboard()
-    
-    if not leaderboard_data or not leaderboard_data:
-        await query.edit_message_text("❌ Could not load leaderboard. Please try again later.")
+    rendered = await build_leaderboard(context, page)
+    if rendered is None:
+        await _edit_leaderboard_message(query, context, "❌ Could not load leaderboard. Please try again later.", None)
         return
     
-    total_users = len(leaderboard_data)
-    total_pages = (total_users + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE
-    
-    # Ensure page is within valid range
-    page = max(1, min(page, total_pages))
-    
-    # Calculate start and end indices for current page
-    start_idx = (page - 1) * LEADERBOARD_PAGE_SIZE
-    end_idx = min(start_idx + LEADERBOARD_PAGE_SIZE, total_users)
-    
-    # Format leaderboard header
-    leaderboard_text = f"<b>🏆 Global Leaderboard</b>\n"
-    leaderboard_text += f"<i>Page {page}/{total_pages} • {total_users} players</i>\n\n"
-    
-    # Emojis for positions
-    position_emojis = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
-    
-    for i in range(start_idx, end_idx):
-        user = leaderboard_data[i]
-        username = user.get('username', 'Unknown')
-        score = user.get('score', 0)
-        position = i + 1
-        
-        # Truncate long usernames
-        if len(username) > 15:
-            username = username[:12] + "..."
-        
-        # Get appropriate emoji for position
-        if position <= 10:
-            position_emoji = position_emojis[position - 1]
-        else:
-            position_emoji = f"{position}."
-        
-        # Highlight current user
-        current_user = context.user_data.get('api_user', {})
-        is_current_user = user.get('id') == current_user.get('id')
-        
-        if is_current_user:
-            leaderboard_text += f"{position_emoji} <b>{username} - {score} pts 👈 YOU</b>\n"
-        else:
-            leaderboard_text += f"{position_emoji} {username} - {score} pts\n"
-    
-    # Add user's own position if not on current page
-    current_user = context.user_data.get('api_user', {})
-    if current_user:
-        user_id = current_user.get('id')
-        user_score = current_user.get('score', 0)
-        
-        # Find user's position in leaderboard
-        user_position = None
-        for i, user in enumerate(leaderboard_data):
-            if user.get('id') == user_id:
-                user_position = i + 1
-                break
-        
-        if user_position and (user_position < start_idx + 1 or user_position > end_idx):
-            leaderboard_text += f"\n<b>Your Position:</b> #{user_position} - {user_score} pts"
-    
-    # Add footer
-    leaderboard_text += "\nPlay more games to climb the ranks! 🎮"
-    
-    # Create pagination buttons
-    keyboard = []
-    
-    # Previous button (only if not on first page)
-    if page > 1:
-        keyboard.append(InlineKeyboardButton("◀️ Previous", callback_data=f"leaderboard_page_{page-1}"))
-    
-    # Refresh button
-    keyboard.append(InlineKeyboardButton("🔄 Refresh", callback_data=f"leaderboard_page_{page}"))
-    
-    # Next button (only if not on last page)
-    if page < total_pages:
-        keyboard.append(InlineKeyboardButton("Next ▶️", callback_data=f"leaderboard_page_{page+1}"))
+    text, reply_markup = rendered
+    await _edit_leaderboard_message(query, context, text, reply_markup)
+
+async def show_leaderboard_around(query, context: CallbackContext):
+    """Compact leaderboard view showing the players ranked just above and below the user"""
+    user_id = query.from_user.id
+    rank_info = await within_budget("leaderboard_rank", get_user_rank(user_id))
+    if rank_info is PENDING:
+        rank_info = cached_rank_info(user_id)
+    
+    if not rank_info:
+        await _edit_leaderboard_message(
+            query,
+            context,
+            "🎯 You're not on the leaderboard yet. Play a game to get ranked!",
+            InlineKeyboardMarkup([[InlineKeyboardButton("🏆 Top Players", callback_data="leaderboard_page_1")]])
+        )
+        return
     
-    # Add jump to my position button if user is in leaderboard
-    if current_user and user_position:
-        keyboard.append(InlineKeyboardButton("📍 My Rank", callback_data=f"leaderboard_jump_{user_position}"))
+    user_rank = rank_info['rank']
+    first_rank = max(1, user_rank - LEADERBOARD_AROUND_RANGE)
+    page_data = await within_budget(
+        "leaderboard",
+        get_leaderboard_page(first_rank - 1, user_rank + LEADERBOARD_AROUND_RANGE - first_rank + 1),
+        default=None,
+    )
     
-    reply_markup = InlineKeyboardMarkup([keyboard]) if keyboard else None
+    if not page_data or not page_data['entries']:
+        await _edit_leaderboard_message(query, context, "❌ Could not load leaderboard. Please try again later.", None)
+        return
     
-    # Edit the message with updated leaderboard
-    await query.edit_message_text(leaderboard_text, parse_mode='HTML', reply_markup=reply_markup)
\ No newline at end of file
+    text, reply_markup = render_around(page_data, first_rank, user_id, user_rank)
+    await _edit_leaderboard_message(query, context, text, reply_markup)
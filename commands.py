@@ -2,7 +2,12 @@
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackContext, ConversationHandler
 from buttons import regular_menu_markup, unlocked_menu_markup, initial_menu_markup
-from api_client import create_user, get_user_by_tg_id, update_user
+from api_client import create_user, get_user_by_tg_id, queue_user_update, invalidate_user
+from notifications import ADMIN_NOTIFY_MODE, notification_digest
+from deadlines import PENDING, within_budget
+from background import background
+from persistence import remember_api_user
+import html
 import logging
 import os
 from datetime import datetime
@@ -21,6 +26,17 @@ def get_admin_group_id():
             return None
     return None
 
+def is_admin(update: Update) -> bool:
+    """Admin commands are allowed in the admin group or from ADMIN_USER_IDS"""
+    admin_user_ids = {
+        part.strip() for part in os.getenv("ADMIN_USER_IDS", "").split(",") if part.strip()
+    }
+    chat = update.effective_chat
+    user = update.effective_user
+    if chat and chat.id == get_admin_group_id():
+        return True
+    return bool(user and str(user.id) in admin_user_ids)
+
 async def send_registration_notification(bot, new_user: dict, context: dict = None):
     """
     Send registration notifications to admin Telegram group
@@ -54,6 +70,12 @@ async def send_registration_notification(bot, new_user: dict, context: dict = No
     if context and context.get('test'):
         event_type = "TEST - " + event_type
     
+    if ADMIN_NOTIFY_MODE == "digest":
+        # Buffered into the next digest instead of two messages on the user's critical path
+        details = "" if not context or context.get('api_response', True) else "not saved to database"
+        notification_digest.add(bot, admin_group_id, user_id, username, phone, event_type, details)
+        return None
+    
     # Current time
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
@@ -115,52 +137,57 @@ async def send_registration_notification(bot, new_user: dict, context: dict = No
         logger.info(f"📨 Would have sent to group {admin_group_id}: {message}")
         return None
 
+def notify_in_background(bot, new_user: dict, context: dict = None) -> None:
+    """Send the admin-group notification after the user has been answered"""
+    background.spawn(
+        send_registration_notification(bot=bot, new_user=new_user, context=context),
+        name="admin_notification"
+    )
+
 async def start(update: Update, context: CallbackContext) -> None:
     user = update.effective_user
     
     try:
         # Check if user already exists in our system
-        existing_user = await get_user_by_tg_id(user.id)
+        # Bypass the profile cache: /start decides new vs returning and writes the profile back
+        existing_user = await within_budget("start", get_user_by_tg_id(user.id, use_cache=False))
         
-        if existing_user:
+        if existing_user is PENDING:
+            # Can't tell new from returning users yet; don't create a duplicate, just let them in
+            logger.warning(f"⚠️ Backend too slow to load user {user.id}, starting without profile")
+            await update.message.reply_text(
+                "Welcome to Gomida Games! 🎮\n\nOur servers are a bit slow right now, your profile will load shortly.",
+                reply_markup=regular_menu_markup
+            )
+        elif existing_user:
             logger.info(f"✅ Existing user found: {user.id} - {user.username}")
             # User exists, check if they have phone
             if existing_user.get('phone'):
-                context.user_data['api_user'] = existing_user
+                remember_api_user(context.user_data, existing_user)
                 context.user_data['contact_shared'] = True
                 
-                # Update user with current Telegram info (in case username changed)
-                update_data = {
-                    "id": user.id,
-                    "username": user.username or f"user_{user.id}",
-                    "phone": existing_user.get('phone', ''),
-                    "score": existing_user.get('score', 0),
-                    "flags_level": existing_user.get('flags_level', 1),
-                    "maps_level": existing_user.get('maps_level', 1),
-                    "attires_level": existing_user.get('attires_level', 1),
-                    "flags_stars": existing_user.get('flags_stars', {}),
-                    "maps_stars": existing_user.get('maps_stars', {}),
-                    "attires_stars": existing_user.get('attires_stars', {})
-                }
+                # Update user with current Telegram info (in case username changed); progress
+                # fields stay as the backend has them
+                update_data = {"username": user.username or f"user_{user.id}"}
                 
-                # Update user in backend
-                updated_user = await update_user(user.id, update_data)
+                # Update user in backend (buffered, and skipped when nothing changed)
+                updated_user = await queue_user_update(user.id, update_data)
                 if updated_user:
-                    context.user_data['api_user'] = updated_user
-                
-                # Notify group about returning user
-                await send_registration_notification(
-                    bot=context.bot,
-                    new_user=context.user_data['api_user'],
-                    context={'contact_shared': True, 'returning_user': True, 'api_response': True}
-                )
+                    remember_api_user(context.user_data, updated_user)
                 
                 await update.message.reply_text(
                     "Welcome back to Gomida Games! 🎮", 
                     reply_markup=unlocked_menu_markup
                 )
+                
+                # Notify group about returning user
+                notify_in_background(
+                    context.bot,
+                    context.user_data['api_user'],
+                    {'contact_shared': True, 'returning_user': True, 'api_response': True}
+                )
             else:
-                context.user_data['api_user'] = existing_user
+                remember_api_user(context.user_data, existing_user)
                 context.user_data['contact_shared'] = False
                 await update.message.reply_text(
                     f"Welcome back {user.username or 'there'}! 👋\n\n"
@@ -188,16 +215,9 @@ async def start(update: Update, context: CallbackContext) -> None:
             api_success = bool(api_response)
             
             if api_response:
-                context.user_data['api_user'] = api_response
+                remember_api_user(context.user_data, api_response)
                 context.user_data['contact_shared'] = False
                 
-                # ✅ Send registration notification to admin group
-                await send_registration_notification(
-                    bot=context.bot,
-                    new_user=api_response,
-                    context={'contact_shared': False, 'api_response': True}
-                )
-                
                 welcome_message = f"Welcome to Gomida Games"
                 if user.username:
                     welcome_message += f", {user.username}"
@@ -207,19 +227,21 @@ async def start(update: Update, context: CallbackContext) -> None:
                     welcome_message,
                     reply_markup=initial_menu_markup
                 )
+                
+                # ✅ Send registration notification to admin group
+                notify_in_background(
+                    context.bot,
+                    api_response,
+                    {'contact_shared': False, 'api_response': True}
+                )
             else:
                 # Fallback if API fails - use local storage only
                 logger.warning(f"⚠️ API failed for user {user.id}, using local storage")
+                # Unstamped, so the next handler tries the backend again
                 context.user_data['api_user'] = user_data
+                context.user_data.pop('api_user_fetched_at', None)
                 context.user_data['contact_shared'] = False
                 
-                # ✅ Still send notification even if API fails
-                await send_registration_notification(
-                    bot=context.bot,
-                    new_user=user_data,
-                    context={'contact_shared': False, 'api_response': False}
-                )
-                
                 welcome_message = f"Welcome to Gomida Games"
                 if user.username:
                     welcome_message += f", {user.username}"
@@ -230,6 +252,13 @@ async def start(update: Update, context: CallbackContext) -> None:
                     reply_markup=regular_menu_markup
                 )
                 
+                # ✅ Still send notification even if API fails
+                notify_in_background(
+                    context.bot,
+                    user_data,
+                    {'contact_shared': False, 'api_response': False}
+                )
+                
     except Exception as e:
         logger.error(f"❌ Error in start command for user {user.id}: {e}")
         welcome_message = "Welcome to Gomida Games! 🎮\n\nThere was an issue connecting to our servers.\nYou can still use basic features."
@@ -253,10 +282,16 @@ async def refresh(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     try:
-        existing_user = await get_user_by_tg_id(user.id)
+        # Drop the cached profile so /refresh always reads from the server
+        invalidate_user(user.id)
+        existing_user = await within_budget("refresh", get_user_by_tg_id(user.id))
         
-        if existing_user:
-            context.user_data['api_user'] = existing_user
+        if existing_user is PENDING:
+            await update.message.reply_text(
+                "⏳ The server is slow right now. Your data will be updated shortly, try /refresh again in a moment."
+            )
+        elif existing_user:
+            remember_api_user(context.user_data, existing_user)
             context.user_data['contact_shared'] = bool(existing_user.get('phone'))
             await update.message.reply_text(
                 "✅ Your data has been refreshed from the server!"
@@ -345,6 +380,10 @@ async def notify_test(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         logger.info(f"✅ Test scenario {i} sent: {scenario['name']}")
     
+    if ADMIN_NOTIFY_MODE == "digest":
+        # Don't make the tester wait for the digest timer
+        await notification_digest.flush()
+    
     await update.message.reply_text("✅ All test notifications sent to admin group!")
 
 # Command to get group ID
@@ -390,4 +429,94 @@ async def myid(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"🔧 *This ID can be added to ADMIN_USER_IDS if needed*"
     )
     
-    await update.message.reply_text(message, parse_mode='Markdown')
\ No newline at end of file
+    await update.message.reply_text(message, parse_mode='Markdown')
+
+def _broadcast_preset(name: str):
+    """Ready-made announcements: /broadcast games, /broadcast terms"""
+    if name == "games":
+        from games import catalog
+        lines = "\n".join(f"• <b>{html.escape(game['name'])}</b>" for game in catalog.games)
+        return f"🎮 <b>Games available now:</b>\n\n{lines}\n\nTap 🎮 Play to jump in!", "HTML"
+    if name == "terms":
+        from docs import TERMS_AND_SERVICES
+        return "📜 Our terms have been updated\\.\n\n" + TERMS_AND_SERVICES, "MarkdownV2"
+    return None
+
+async def _report_broadcast(bot, chat_id: int, job: dict):
+    from broadcast import format_report
+    icon = "✅" if job['status'] == 'done' else "⚠️"
+    try:
+        await bot.send_message(
+            chat_id=chat_id,
+            text=f"{icon} Broadcast #{job['id']} {job['status']}: {format_report(job)}"
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to report broadcast {job['id']}: {e}")
+
+# Admin command to announce something to every registered user
+async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send a message to all users: /broadcast <text>, /broadcast games or /broadcast terms"""
+    from broadcast import broadcast_running, start_broadcast
+
+    if not is_admin(update):
+        await update.message.reply_text("⛔ This command is for admins only.")
+        return
+    if broadcast_running():
+        await update.message.reply_text("⏳ A broadcast is already running. Check /broadcast_status")
+        return
+
+    text = update.message.text.partition(" ")[2].strip()
+    if not text:
+        await update.message.reply_text(
+            "Usage: /broadcast <message>\n"
+            "Presets: /broadcast games, /broadcast terms"
+        )
+        return
+
+    preset = _broadcast_preset(text.lower())
+    text, parse_mode = preset if preset else (text, None)
+
+    chat_id = update.effective_chat.id
+    job = await start_broadcast(
+        context.bot, text, parse_mode,
+        on_done=lambda finished: _report_broadcast(context.bot, chat_id, finished)
+    )
+    logger.info(f"📣 Broadcast {job['id']} started by {update.effective_user.id}")
+    await update.message.reply_text(f"📣 Broadcast #{job['id']} started. Check /broadcast_status")
+
+async def broadcast_resume(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Continue the last broadcast that was interrupted"""
+    from broadcast import broadcast_running, resume_broadcast
+
+    if not is_admin(update):
+        await update.message.reply_text("⛔ This command is for admins only.")
+        return
+    if broadcast_running():
+        await update.message.reply_text("⏳ A broadcast is already running. Check /broadcast_status")
+        return
+
+    chat_id = update.effective_chat.id
+    job = await resume_broadcast(
+        context.bot,
+        on_done=lambda finished: _report_broadcast(context.bot, chat_id, finished)
+    )
+    if not job:
+        await update.message.reply_text("✅ No unfinished broadcast to resume.")
+        return
+    await update.message.reply_text(f"📣 Resuming broadcast #{job['id']} from user {job['next_offset']}")
+
+async def broadcast_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show progress of the current or last broadcast"""
+    from broadcast import current_broadcast, format_report
+
+    if not is_admin(update):
+        await update.message.reply_text("⛔ This command is for admins only.")
+        return
+
+    job = current_broadcast()
+    if not job:
+        await update.message.reply_text("ℹ️ No broadcast has run since the bot started.")
+        return
+    await update.message.reply_text(
+        f"📣 Broadcast #{job['id']} {job['status']} at user {job['next_offset']}\n{format_report(job)}"
+    )
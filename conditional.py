@@ -0,0 +1,103 @@
+# conditional.py
+import hashlib
+import os
+from typing import Any, Dict, Hashable, Tuple
+
+import httpx
+
+import fastjson
+from cache import TTLCache
+
+# Validators outlive the profile / leaderboard caches so an expired entry can be revalidated cheaply
+VALIDATOR_CACHE_SIZE = int(os.getenv("VALIDATOR_CACHE_SIZE", "10000"))
+VALIDATOR_CACHE_TTL = float(os.getenv("VALIDATOR_CACHE_TTL", "86400"))
+
+
+class _Validated:
+    __slots__ = ("etag", "last_modified", "digest", "size", "payload")
+
+    def __init__(self, etag, last_modified, digest: bytes, size: int, payload: Any):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.size = size
+        self.payload = payload
+
+
+class ConditionalStore:
+    """
+    Keeps the last parsed body of a GET together with its validators.
+
+    headers_for() turns the next request into a conditional one (If-None-Match /
+    If-Modified-Since). resolve() hands back the stored object on 304, and also when a
+    200 body is byte-for-byte the same as last time (backends without validators), so
+    unchanged payloads are neither decoded nor re-indexed. The returned `changed` flag
+    lets callers skip their own rebuilds; the payload object is shared, don't mutate it.
+    """
+
+    def __init__(self, maxsize: int = VALIDATOR_CACHE_SIZE, ttl: float = VALIDATOR_CACHE_TTL):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl, name="validators")
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged_bodies = 0
+        self.decodes = 0
+        self.bytes_received = 0
+        self.bytes_saved = 0
+
+    def headers_for(self, key: Hashable) -> Dict[str, str]:
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def resolve(self, key: Hashable, response: httpx.Response) -> Tuple[Any, bool]:
+        """(payload, changed) for a 200 or 304 response to a request made with headers_for(key)"""
+        self.requests += 1
+        entry = self._entries.get(key)
+
+        if response.status_code == 304:
+            if entry is None:
+                raise ValueError(f"304 for {key} without a stored body")
+            self.not_modified += 1
+            self.bytes_saved += entry.size
+            return entry.payload, False
+
+        content = response.content
+        self.bytes_received += len(content)
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+
+        if entry is not None and entry.digest == digest:
+            # Same bytes as last time: reuse the parsed object
+            self.unchanged_bodies += 1
+            entry.etag, entry.last_modified = etag, last_modified
+            return entry.payload, False
+
+        self.decodes += 1
+        payload = fastjson.loads(content)
+        self._entries.set(key, _Validated(etag, last_modified, digest, len(content), payload))
+        return payload, True
+
+    def has_body(self, key: Hashable) -> bool:
+        """False once the entry is gone (evicted / expired): a 304 for it can't be resolved"""
+        return key in self._entries
+
+    def forget(self, key: Hashable) -> None:
+        self._entries.invalidate(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "unchanged_bodies": self.unchanged_bodies,
+            "decodes": self.decodes,
+            "decodes_skipped": self.not_modified + self.unchanged_bodies,
+            "bytes_received": self.bytes_received,
+            "bytes_saved": self.bytes_saved,
+        }
@@ -0,0 +1,59 @@
+# deadlines.py
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Seconds a handler may wait on one backend read before answering with what it has.
+# Override per handler with HANDLER_BUDGET_<NAME>, e.g. HANDLER_BUDGET_ACCOUNT=1.5
+DEFAULT_BUDGETS = {
+    "profile": 3.0,
+    "account": 1.5,
+    "leaderboard": 3.0,
+    "leaderboard_rank": 1.0,
+    "start": 4.0,
+    "refresh": 5.0,
+}
+
+# Returned by within_budget() when the read didn't finish in time
+PENDING = object()
+
+_timeouts: Dict[str, int] = {}
+_calls: Dict[str, int] = {}
+
+
+def budget_for(name: str) -> float:
+    return float(os.getenv(f"HANDLER_BUDGET_{name.upper()}", DEFAULT_BUDGETS.get(name, 3.0)))
+
+
+def _consume_result(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"⚠️ Late backend read failed: {task.exception()}")
+
+
+async def within_budget(name: str, aw: Awaitable[Any], default: Any = PENDING) -> Any:
+    """
+    Await a backend read for at most the handler's budget.
+
+    On timeout the read keeps running in the background (so it still warms the caches for
+    the next request) and `default` is returned so the handler can degrade instead of wait.
+    """
+    _calls[name] = _calls.get(name, 0) + 1
+    task = asyncio.ensure_future(aw)
+    done, _ = await asyncio.wait({task}, timeout=budget_for(name))
+    if done:
+        return task.result()
+
+    _timeouts[name] = _timeouts.get(name, 0) + 1
+    task.add_done_callback(_consume_result)
+    logger.info(f"⏱️ {name} read exceeded its {budget_for(name):.1f}s budget, answering without it")
+    return default
+
+
+def budget_stats() -> Dict[str, Any]:
+    return {
+        name: {"budget": budget_for(name), "calls": _calls.get(name, 0), "timeouts": _timeouts.get(name, 0)}
+        for name in sorted(set(DEFAULT_BUDGETS) | set(_calls))
+    }
@@ -0,0 +1,165 @@
+# dedup.py
+import abc
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# "memory" (per process) or "sqlite" (shared by every worker process on the host)
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "memory").lower()
+# How many recent update_ids to remember
+DEDUP_WINDOW = int(os.getenv("DEDUP_WINDOW", "4096"))
+DEDUP_SQLITE_PATH = os.getenv("DEDUP_SQLITE_PATH", "/tmp/gomida_update_ids.db")
+# Telegram keeps undelivered updates for 24h, so after this long without updates an id far
+# below the last one can't be a redelivery: it's Telegram starting a new random sequence
+DEDUP_SEQUENCE_IDLE = float(os.getenv("DEDUP_SEQUENCE_IDLE", "86400"))
+
+
+class DedupBackend(abc.ABC):
+    """Remembers recently seen update_ids so redelivered webhooks can be acked without processing"""
+
+    def __init__(self, window: int = DEDUP_WINDOW):
+        self.window = window
+        self.checked = 0
+        self.duplicates = 0
+
+    async def seen(self, update_id: int) -> bool:
+        """Record update_id, returning True if it was already recorded (a duplicate)"""
+        self.checked += 1
+        duplicate = await self._check_and_add(update_id)
+        if duplicate:
+            self.duplicates += 1
+        return duplicate
+
+    @abc.abstractmethod
+    async def forget(self, update_id: int) -> None:
+        """Un-record an update that failed, so Telegram's redelivery is processed again"""
+
+    @abc.abstractmethod
+    async def _check_and_add(self, update_id: int) -> bool:
+        """Record update_id, True if it was already recorded"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "window": self.window,
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+        }
+
+
+class MemoryDedupBackend(DedupBackend):
+    """
+    Sliding bitmap over the last `window` update_ids.
+
+    Telegram's update_ids increase, so one int bitmap anchored at the highest id seen costs
+    window/8 bytes no matter how many updates flow through. A forward jump past the window
+    starts the bitmap over. An id more than `window` below the highest is a very late
+    redelivery (treated as seen), unless nothing arrived for DEDUP_SEQUENCE_IDLE: after a
+    quiet week Telegram starts over from a random, possibly lower, id.
+    """
+
+    def __init__(self, window: int = DEDUP_WINDOW, sequence_idle: float = DEDUP_SEQUENCE_IDLE,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(window)
+        self.sequence_idle = sequence_idle
+        self._clock = clock
+        self._high: Optional[int] = None
+        self._bits = 0  # bit n set => update_id (high - n) was seen
+        self._mask = (1 << window) - 1
+        self._last_seen_at = 0.0
+        self.sequence_resets = 0
+
+    async def _check_and_add(self, update_id: int) -> bool:
+        now = self._clock()
+        idle, self._last_seen_at = now - self._last_seen_at, now
+        if self._high is None:
+            self._high, self._bits = update_id, 1
+            return False
+
+        gap = update_id - self._high
+        if gap >= self.window:
+            # Nothing we track is within reach: start the bitmap over instead of shifting it
+            self._high, self._bits = update_id, 1
+            return False
+
+        if -gap >= self.window:
+            if idle < self.sequence_idle:
+                # Older than anything we track: only a redelivery can be this far behind
+                return True
+            self.sequence_resets += 1
+            logger.info(f"🔁 update_id restarted at {update_id} after {idle / 3600:.0f}h without updates")
+            self._high, self._bits = update_id, 1
+            return False
+
+        if gap > 0:
+            self._bits = ((self._bits << gap) | 1) & self._mask
+            self._high = update_id
+            return False
+
+        offset = -gap
+
+        bit = 1 << offset
+        if self._bits & bit:
+            return True
+        self._bits |= bit
+        return False
+
+    async def forget(self, update_id: int) -> None:
+        if self._high is None:
+            return
+        offset = self._high - update_id
+        if 0 <= offset < self.window:
+            self._bits &= ~(1 << offset)
+
+
+class SQLiteDedupBackend(DedupBackend):
+    """update_id set in a local SQLite file, shared by all worker processes on the same host"""
+
+    def __init__(self, path: str = DEDUP_SQLITE_PATH, window: int = DEDUP_WINDOW):
+        super().__init__(window)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen_updates (update_id INTEGER PRIMARY KEY)")
+        self._lock = asyncio.Lock()
+        self._inserts = 0
+
+    def _insert(self, update_id: int) -> bool:
+        cursor = self._conn.execute("INSERT OR IGNORE INTO seen_updates (update_id) VALUES (?)", (update_id,))
+        duplicate = cursor.rowcount == 0
+        if not duplicate:
+            self._inserts += 1
+            if self._inserts % 256 == 0:
+                # Keep the table at roughly `window` rows
+                self._conn.execute(
+                    "DELETE FROM seen_updates WHERE update_id < (SELECT MAX(update_id) FROM seen_updates) - ?",
+                    (self.window,),
+                )
+        return duplicate
+
+    async def _check_and_add(self, update_id: int) -> bool:
+        async with self._lock:
+            return await asyncio.to_thread(self._insert, update_id)
+
+    async def forget(self, update_id: int) -> None:
+        async with self._lock:
+            await asyncio.to_thread(
+                self._conn.execute, "DELETE FROM seen_updates WHERE update_id = ?", (update_id,)
+            )
+
+
+def create_dedup_backend() -> DedupBackend:
+    """Build the backend selected by DEDUP_BACKEND"""
+    if DEDUP_BACKEND == "sqlite":
+        try:
+            return SQLiteDedupBackend()
+        except sqlite3.Error as e:
+            logger.error(f"❌ Could not open update dedup database {DEDUP_SQLITE_PATH}: {e}, using memory")
+    elif DEDUP_BACKEND != "memory":
+        logger.warning(f"⚠️ Unknown DEDUP_BACKEND {DEDUP_BACKEND!r}, using memory")
+    return MemoryDedupBackend()
@@ -0,0 +1,264 @@
+# dispatcher.py
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Deque, Dict, Hashable, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from metrics import handler_latency
+
+logger = logging.getLogger(__name__)
+
+# How many updates may run at once across all users
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+# Upper bound on idle per-user locks kept around
+UPDATE_LOCK_TABLE_SIZE = int(os.getenv("UPDATE_LOCK_TABLE_SIZE", "10000"))
+
+# Ordering key whose lock the current task already holds (set by process_in_order)
+_held_key: contextvars.ContextVar[Optional[Hashable]] = contextvars.ContextVar("held_key", default=None)
+
+# Metric labels for the reply keyboard buttons and commands (anything else is "text_other" /
+# "command_other", keeping the label set bounded whatever users type)
+MENU_BUTTONS = {
+    "👤 Account": "menu_account",
+    "🎮 Play": "menu_play",
+    "✉️ Invite": "menu_invite",
+    "👥🏅 Leaderboard": "menu_leaderboard",
+    "📜Terms & Conditions": "menu_terms",
+    "⚙️ Settings": "menu_settings",
+    "Skip Contact": "skip_contact",
+}
+COMMANDS = ("start", "stop", "refresh", "notifytest", "broadcast", "broadcast_resume", "broadcast_status")
+CALLBACK_PREFIXES = (
+    ("leaderboard_page_", "leaderboard_page"),
+    ("leaderboard_jump_", "leaderboard_jump"),
+    ("leaderboard_around", "leaderboard_around"),
+    ("back_to_menu", "back_to_menu"),
+)
+
+
+def handler_label(update: object) -> str:
+    """Which handler an update is headed for, as a low-cardinality metric label"""
+    if not isinstance(update, Update):
+        return "other"
+    query = update.callback_query
+    if query is not None:
+        if query.game_short_name:
+            return "game"
+        data = query.data or ""
+        for prefix, label in CALLBACK_PREFIXES:
+            if data.startswith(prefix):
+                return label
+        return "callback_other"
+    message = update.effective_message
+    if message is None:
+        return "other"
+    if message.contact is not None:
+        return "contact_shared"
+    text = message.text or ""
+    if text.startswith("/"):
+        command = text[1:].split(maxsplit=1)[0].split("@", 1)[0] if len(text) > 1 else ""
+        return f"command_{command}" if command in COMMANDS else "command_other"
+    return MENU_BUTTONS.get(text, "text_other")
+
+
+handler_latency.preallocate(
+    *((label,) for label in MENU_BUTTONS.values()),
+    *((f"command_{command}",) for command in COMMANDS),
+    *((label,) for _, label in CALLBACK_PREFIXES),
+    ("game",), ("contact_shared",),
+)
+
+
+class _LockEntry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # updates holding or waiting on this lock
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Runs updates from different users concurrently while keeping each user's updates in order.
+
+    Same-user updates queue on a per-user lock (FIFO) before taking one of the shared
+    concurrency slots, so a user spamming buttons can't starve everyone else.
+    """
+
+    def __init__(self, max_concurrent_updates: int = UPDATE_CONCURRENCY, max_locks: int = UPDATE_LOCK_TABLE_SIZE):
+        super().__init__(max_concurrent_updates)
+        self.max_locks = max_locks
+        self._locks: "OrderedDict[Hashable, _LockEntry]" = OrderedDict()
+        # Updates handed over by queue workers while the same user's update was running
+        self._backlogs: Dict[Hashable, Deque[Tuple[object, Awaitable[Any]]]] = {}
+        self.in_flight = 0
+        self.evictions = 0
+        self.chained = 0
+
+    @staticmethod
+    def ordering_key(update: object) -> Optional[Hashable]:
+        """Key whose updates must run in order: the user, else the chat"""
+        if isinstance(update, Update):
+            if update.effective_user:
+                return ("user", update.effective_user.id)
+            if update.effective_chat:
+                return ("chat", update.effective_chat.id)
+        return None
+
+    @asynccontextmanager
+    async def _ordered(self, key: Optional[Hashable]) -> AsyncIterator[None]:
+        if key is None:
+            yield
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = _LockEntry()
+        self._locks.move_to_end(key)
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            self._evict_idle()
+
+    def _evict_idle(self) -> None:
+        """Trim idle locks, oldest first; locks in use are never evicted"""
+        if len(self._locks) <= self.max_locks:
+            return
+        for key in list(self._locks):
+            if len(self._locks) <= self.max_locks:
+                break
+            if self._locks[key].users == 0:
+                del self._locks[key]
+                self.evictions += 1
+
+    def user_busy(self, user_id: int) -> bool:
+        """True while one of the user's updates (or in-order work) is running or waiting"""
+        entry = self._locks.get(("user", user_id))
+        return entry is not None and entry.users > 0
+
+    async def process_in_order(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Wait for the user's earlier updates, then run this one through process_update.
+
+        The per-user lock is taken before PTB's (final) process_update takes a concurrency
+        slot, so queued same-user updates don't hold slots while they wait.
+        """
+        key = self.ordering_key(update)
+        async with self._ordered(key):
+            token = _held_key.set(key)
+            try:
+                await self.process_update(update, coroutine)
+            finally:
+                _held_key.reset(token)
+
+    async def process_without_waiting(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Like process_in_order, for callers that shouldn't wait behind the same user's updates.
+
+        If the user already has an update running here, this one is appended to their backlog
+        and the call returns at once; the caller running that user's update works through
+        the backlog in order. A user tapping fast thus holds one queue worker, not all of them.
+        """
+        key = self.ordering_key(update)
+        if key is None:
+            await self.process_in_order(update, coroutine)
+            return
+
+        backlog = self._backlogs.get(key)
+        if backlog is not None:
+            backlog.append((update, coroutine))
+            self.chained += 1
+            return
+
+        backlog = self._backlogs[key] = deque([(update, coroutine)])
+        try:
+            while backlog:
+                next_update, next_coroutine = backlog[0]
+                try:
+                    await self.process_in_order(next_update, next_coroutine)
+                except Exception as e:
+                    logger.error(f"❌ Error processing update {getattr(next_update, 'update_id', '?')}: {e}")
+                finally:
+                    backlog.popleft()
+        finally:
+            del self._backlogs[key]
+            for _, pending in backlog:
+                # Cancelled (shutdown) with updates still waiting: don't leak un-awaited coroutines
+                pending.close()
+
+    async def run_for_user(self, user_id: int, coroutine: Awaitable[Any]) -> Any:
+        """Run work started outside an update (e.g. a background refresh) in the user's update order"""
+        async with self._ordered(("user", user_id)):
+            return await coroutine
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self.ordering_key(update)
+        if key is not None and _held_key.get() != key:
+            # Handed to us directly by PTB (polling) rather than through dispatch_update:
+            # still keep the user's updates in order, at the cost of a slot while waiting
+            async with self._ordered(key):
+                await self._run(update, coroutine)
+        else:
+            await self._run(update, coroutine)
+
+    async def _run(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            await coroutine
+        finally:
+            self.in_flight -= 1
+            handler_latency.labels(handler_label(update)).observe(time.monotonic() - started)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent_updates": self.max_concurrent_updates,
+            "in_flight": self.in_flight,
+            "locks": len(self._locks),
+            "max_locks": self.max_locks,
+            "lock_evictions": self.evictions,
+            "backlogged": sum(len(backlog) - 1 for backlog in self._backlogs.values()),
+            "chained": self.chained,
+        }
+
+
+async def dispatch_update(application, update: Update) -> None:
+    """Process an update through the application's update processor (ordering + concurrency)"""
+    processor = application.update_processor
+    if isinstance(processor, PerUserUpdateProcessor):
+        await processor.process_in_order(update, application.process_update(update))
+    else:
+        await processor.process_update(update, application.process_update(update))
+
+
+async def dispatch_queued_update(application, update: Update) -> None:
+    """For queue workers: never block a worker on another update from the same user"""
+    processor = application.update_processor
+    if isinstance(processor, PerUserUpdateProcessor):
+        await processor.process_without_waiting(update, application.process_update(update))
+    else:
+        await processor.process_update(update, application.process_update(update))
+
+
+async def in_user_order(application, user_id: int, coroutine: Awaitable[Any]) -> Any:
+    """Await `coroutine` between the user's updates rather than alongside them"""
+    processor = application.update_processor
+    if isinstance(processor, PerUserUpdateProcessor):
+        return await processor.run_for_user(user_id, coroutine)
+    return await coroutine
@@ -0,0 +1,65 @@
+# fastjson.py
+import json
+import logging
+import os
+from typing import Any, Union
+
+logger = logging.getLogger(__name__)
+
+# "auto" picks the fastest installed backend; "orjson", "msgspec" or "json" forces one
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+
+def _stdlib_loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _load_backend(name: str):
+    if name == "orjson":
+        import orjson
+        return orjson.loads, orjson.dumps
+    if name == "msgspec":
+        import msgspec
+        decoder, encoder = msgspec.json.Decoder(), msgspec.json.Encoder()
+
+        def msgspec_loads(data):
+            # msgspec.DecodeError isn't a ValueError; callers rely on ValueError for bad input
+            try:
+                return decoder.decode(data)
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from e
+
+        return msgspec_loads, encoder.encode
+    return _stdlib_loads, _stdlib_dumps
+
+
+def _select_backend():
+    candidates = ["orjson", "msgspec"] if JSON_BACKEND == "auto" else [JSON_BACKEND]
+    for name in candidates:
+        if name == "json":
+            break
+        try:
+            return (name,) + _load_backend(name)
+        except ImportError:
+            if JSON_BACKEND != "auto":
+                logger.warning(f"⚠️ JSON_BACKEND={name} is not installed, using stdlib json")
+    return ("json",) + _load_backend("json")
+
+
+BACKEND, _loads, _dumps = _select_backend()
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode JSON straight from bytes (no intermediate str copy with orjson/msgspec); ValueError if invalid"""
+    return _loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to compact UTF-8 JSON bytes"""
+    return _dumps(obj)
@@ -0,0 +1,35 @@
+# game_links.py
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from games import catalog
+
+
+def launch_url(short_name: str, user, api_user: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Game URL for a Telegram user, from the update itself plus whatever profile we already hold.
+
+    Never touches the backend; a missing profile just means default progress values.
+    """
+    entry = catalog.launch_entry(short_name)
+    if entry is None:
+        return None
+    prefix, game_param = entry
+    api_user = api_user or {}
+
+    params = (
+        ("tg_user_id", user.id),
+        ("tg_first_name", user.first_name),
+        ("tg_last_name", user.last_name),
+        ("tg_username", user.username),
+        ("tg_language", user.language_code or "en"),
+        ("user_score", api_user.get("score", 0)),
+        ("user_id", api_user.get("id", user.id)),
+        ("flags_level", api_user.get("flags_level", 1)),
+        ("maps_level", api_user.get("maps_level", 1)),
+        ("attires_level", api_user.get("attires_level", 1)),
+        ("phone", api_user.get("phone")),
+    )
+    # Only include non-empty values
+    query = "&".join(f"{key}={quote(str(value))}" for key, value in params if value not in (None, ""))
+    return f"{prefix}{query}&{game_param}"
@@ -1,4 +1,24 @@
-games = [
+# games.py
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The catalog file (JSON, or TOML with a .toml extension); edits are picked up without a redeploy
+GAME_CATALOG_PATH = os.getenv(
+    "GAME_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "games.json")
+)
+# How often to look at the file's mtime (lookups in between never touch the filesystem)
+GAME_CATALOG_CHECK_INTERVAL = float(os.getenv("GAME_CATALOG_CHECK_INTERVAL", "5"))
+
+# "games" sends one Telegram game message per game, "menu" one message with a button per game
+PLAY_MENU_MODE = os.getenv("PLAY_MENU_MODE", "games").lower()
+
+# Built-in catalog, used when the file is missing (e.g. not bundled with the deployment)
+DEFAULT_GAMES = [
     {
         "name": "Level Up",
         "short_name": "levelup",
@@ -14,4 +34,109 @@ games = [
         "short_name": "matchafrica",
         "url": "https://match-africa-host.vercel.app/"
     }
-]
\ No newline at end of file
+]
+
+
+def _launch_entry(game: Dict[str, Any]) -> Tuple[str, str]:
+    """(URL prefix up to the query string, trailing game parameter), built once per load"""
+    url = game["url"]
+    return url + ("&" if "?" in url else "?"), f"game={game['short_name']}"
+
+
+def _read_catalog(path: str) -> List[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        if path.endswith(".toml"):
+            import tomllib
+            data = tomllib.load(f)
+        else:
+            data = json.load(f)
+    entries = data.get("games") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("expected a list of games (or {\"games\": [...]})")
+    for game in entries:
+        missing = {"name", "short_name", "url"} - set(game)
+        if missing:
+            raise ValueError(f"game {game.get('short_name', '?')} is missing {', '.join(sorted(missing))}")
+    return entries
+
+
+class GameCatalog:
+    """Games by short_name, reloaded when the catalog file changes, with launch counters"""
+
+    def __init__(self, path: str = GAME_CATALOG_PATH, check_interval: float = GAME_CATALOG_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._games: List[Dict[str, Any]] = []
+        self._by_short_name: Dict[str, Dict[str, Any]] = {}
+        self._launch: Dict[str, Tuple[str, str]] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.loaded_from = "default"
+        self.reloads = 0
+        self.reload_errors = 0
+        self.launches: Dict[str, int] = {}
+        self._install(DEFAULT_GAMES)
+        self.reload_if_changed(force=True)
+
+    def _install(self, entries: List[Dict[str, Any]]) -> None:
+        # Build the new indexes first and swap them in together
+        by_short_name = {game["short_name"]: game for game in entries}
+        launch = {short_name: _launch_entry(game) for short_name, game in by_short_name.items()}
+        self._games, self._by_short_name, self._launch = list(entries), by_short_name, launch
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """Re-read the file if its mtime changed; a broken file keeps the current catalog"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+
+        try:
+            entries = _read_catalog(self.path)
+        except Exception as e:
+            self.reload_errors += 1
+            logger.error(f"❌ Game catalog {self.path} is invalid, keeping the current one: {e}")
+            self._mtime = mtime
+            return False
+
+        self._install(entries)
+        self._mtime = mtime
+        self.loaded_from = self.path
+        self.reloads += 1
+        logger.info(f"🎮 Game catalog loaded: {len(entries)} games from {self.path}")
+        return True
+
+    @property
+    def games(self) -> List[Dict[str, Any]]:
+        self.reload_if_changed()
+        return self._games
+
+    def get(self, short_name: str) -> Optional[Dict[str, Any]]:
+        self.reload_if_changed()
+        return self._by_short_name.get(short_name)
+
+    def launch_entry(self, short_name: str) -> Optional[Tuple[str, str]]:
+        self.reload_if_changed()
+        return self._launch.get(short_name)
+
+    def record_launch(self, short_name: str) -> None:
+        self.launches[short_name] = self.launches.get(short_name, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "games": len(self._games),
+            "source": self.loaded_from,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "launches": dict(self.launches),
+        }
+
+
+catalog = GameCatalog()
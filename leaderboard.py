@@ -0,0 +1,155 @@
+# leaderboard.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from api_client import get_leaderboard
+
+logger = logging.getLogger(__name__)
+
+# Serve snapshots younger than this without touching the backend
+LEADERBOARD_MAX_AGE = float(os.getenv("LEADERBOARD_MAX_AGE", "30"))
+# Older snapshots are still served while a background refresh runs, up to this age
+LEADERBOARD_STALE_MAX_AGE = float(os.getenv("LEADERBOARD_STALE_MAX_AGE", "600"))
+
+
+class LeaderboardSnapshot:
+    """Immutable view of the leaderboard as fetched at one point in time"""
+
+    __slots__ = ("entries", "version", "fetched_at", "_rank_by_id")
+
+    def __init__(self, entries: List[Dict], version: int):
+        self.entries = entries
+        self.version = version
+        self.fetched_at = time.monotonic()
+        # id -> 1-based rank, built once so every lookup afterwards is O(1)
+        self._rank_by_id: Dict[Any, int] = {}
+        for rank, entry in enumerate(entries, 1):
+            user_id = entry.get('id')
+            if user_id is not None and user_id not in self._rank_by_id:
+                self._rank_by_id[user_id] = rank
+
+    def rank_of(self, user_id: Any) -> Optional[int]:
+        """1-based rank of a user, or None if they're not on the board"""
+        return self._rank_by_id.get(user_id)
+
+    def entry_for(self, user_id: Any) -> Optional[Dict]:
+        rank = self._rank_by_id.get(user_id)
+        return self.entries[rank - 1] if rank else None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def touch(self) -> None:
+        """Mark the snapshot as freshly confirmed by the backend"""
+        self.fetched_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class LeaderboardCache:
+    """Shared leaderboard snapshot with single-flight refresh and stale-while-revalidate"""
+
+    def __init__(self, max_age: float = LEADERBOARD_MAX_AGE, stale_max_age: float = LEADERBOARD_STALE_MAX_AGE):
+        self.max_age = max_age
+        self.stale_max_age = stale_max_age
+        self._snapshot: Optional[LeaderboardSnapshot] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._version = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.unchanged = 0
+
+    @property
+    def snapshot(self) -> Optional[LeaderboardSnapshot]:
+        return self._snapshot
+
+    async def get(self, max_age: Optional[float] = None) -> Optional[LeaderboardSnapshot]:
+        """
+        Return the current snapshot.
+
+        Fresh snapshots are returned as-is, stale ones are returned immediately while a
+        background refresh runs, and a missing or expired snapshot waits on the (shared) fetch.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        snapshot = self._snapshot
+
+        if snapshot is not None:
+            if snapshot.age <= max_age:
+                self.hits += 1
+                return snapshot
+            if snapshot.age <= self.stale_max_age:
+                self.stale_hits += 1
+                self._refresh_in_background()
+                return snapshot
+
+        self.misses += 1
+        return await self.refresh()
+
+    async def refresh(self) -> Optional[LeaderboardSnapshot]:
+        """Fetch a new snapshot, joining any fetch already in flight"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+        # shield() so a cancelled caller doesn't cancel the fetch other callers wait on
+        return await asyncio.shield(self._inflight)
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    def seed(self, entries: List[Dict]) -> LeaderboardSnapshot:
+        """Install a full board fetched elsewhere as the current snapshot"""
+        self._version += 1
+        self._snapshot = LeaderboardSnapshot(entries, self._version)
+        return self._snapshot
+
+    def _refresh_in_background(self) -> None:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(_log_task_error)
+
+    async def _fetch(self) -> Optional[LeaderboardSnapshot]:
+        self.fetches += 1
+        entries = await get_leaderboard()
+        if entries is None:
+            # Keep serving whatever we had rather than failing the caller
+            if self._snapshot is not None:
+                logger.warning(f"⚠️ Leaderboard refresh failed, serving snapshot v{self._snapshot.version}")
+            return self._snapshot
+
+        if self._snapshot is not None and entries is self._snapshot.entries:
+            # Backend confirmed nothing changed: keep the index and version (rendered pages stay valid)
+            self.unchanged += 1
+            self._snapshot.touch()
+            return self._snapshot
+
+        self._version += 1
+        self._snapshot = LeaderboardSnapshot(entries, self._version)
+        logger.info(f"🏆 Leaderboard snapshot v{self._version} ({len(entries)} players)")
+        return self._snapshot
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "size": len(snapshot) if snapshot else 0,
+            "age": round(snapshot.age, 1) if snapshot else None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "unchanged": self.unchanged,
+        }
+
+
+def _log_task_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Background leaderboard refresh failed: {task.exception()}")
+
+
+leaderboard_cache = LeaderboardCache()
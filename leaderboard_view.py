@@ -0,0 +1,166 @@
+# leaderboard_view.py
+import hashlib
+import html
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from cache import TTLCache
+
+# Constants for leaderboard pagination
+LEADERBOARD_PAGE_SIZE = 15  # Users per page (increased from 10)
+LEADERBOARD_AROUND_RANGE = 3  # Players shown above and below the user in the "Around Me" view
+
+# Emojis for positions
+POSITION_EMOJIS = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+
+FOOTER = "\nPlay more games to climb the ranks! 🎮"
+
+
+class RenderedPage:
+    """Shared HTML for one leaderboard page, plus what's needed to highlight a single row"""
+
+    __slots__ = ("header", "lines", "highlighted", "body", "row_by_id")
+
+    def __init__(self, header: str, rows: List[Tuple[Any, str, str]]):
+        self.header = header
+        self.lines = [plain for _, plain, _ in rows]
+        self.highlighted = [bold for _, _, bold in rows]
+        self.body = header + "".join(self.lines)
+        self.row_by_id = {user_id: i for i, (user_id, _, _) in enumerate(rows) if user_id is not None}
+
+    def for_user(self, user_id: Any) -> str:
+        """Page body with the "👈 YOU" highlight applied for this user"""
+        row = self.row_by_id.get(user_id)
+        if row is None:
+            return self.body
+        lines = self.lines.copy()
+        lines[row] = self.highlighted[row]
+        return self.header + "".join(lines)
+
+
+# Rendered page bodies keyed by snapshot version (or page content when unversioned)
+_page_cache = TTLCache(maxsize=256, ttl=600, name="leaderboard_pages")
+
+
+def _format_username(entry: Dict) -> str:
+    username = entry.get('username') or 'Unknown'
+    # Truncate long usernames
+    if len(username) > 15:
+        username = username[:12] + "..."
+    return html.escape(username)
+
+
+def _page_key(page_data: Dict) -> Tuple:
+    version = page_data.get('version')
+    if version is not None:
+        return (version, page_data['page'], page_data['total'])
+    entries = tuple((e.get('id'), e.get('username'), e.get('score')) for e in page_data['entries'])
+    return (page_data['page'], page_data['total'], page_data.get('has_more'), entries)
+
+
+def render_page_body(page_data: Dict) -> RenderedPage:
+    """Render (or reuse) the user-independent part of a leaderboard page"""
+    key = _page_key(page_data)
+    rendered = _page_cache.get(key)
+    if rendered is not None:
+        return rendered
+
+    page, total_pages = page_data['page'], page_data['total_pages']
+    if total_pages is not None:
+        subtitle = f"Page {page}/{total_pages} • {page_data['total']} players"
+    elif page_data.get('has_more'):
+        subtitle = f"Page {page} • more players on the next pages"
+    else:
+        subtitle = f"Page {page}"
+    header = f"<b>🏆 Global Leaderboard</b>\n<i>{subtitle}</i>\n\n"
+
+    rows = []
+    start = (page - 1) * LEADERBOARD_PAGE_SIZE + 1
+    for position, entry in enumerate(page_data['entries'], start):
+        position_emoji = POSITION_EMOJIS[position - 1] if position <= 10 else f"{position}."
+        username = _format_username(entry)
+        score = entry.get('score', 0)
+        rows.append((
+            entry.get('id'),
+            f"{position_emoji} {username} - {score} pts\n",
+            f"{position_emoji} <b>{username} - {score} pts 👈 YOU</b>\n",
+        ))
+
+    rendered = RenderedPage(header, rows)
+    _page_cache.set(key, rendered)
+    return rendered
+
+
+def render_leaderboard(page_data: Dict, current_user: Dict, rank_info: Optional[Dict]) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """Full leaderboard message for one user: cached page body + per-user overlay + keyboard"""
+    if not page_data['total'] and not page_data['entries']:
+        return "🏆 Leaderboard is empty. Be the first to score points!", None
+
+    page = page_data['page']
+    rendered = render_page_body(page_data)
+
+    user_id = current_user.get('id') if current_user else None
+    text = rendered.for_user(user_id)
+
+    # Add user's own position if not on current page
+    user_position = rank_info['rank'] if current_user and rank_info else None
+    if user_position and user_id not in rendered.row_by_id:
+        text += f"\n<b>Your Position:</b> #{user_position} - {current_user.get('score', 0)} pts"
+
+    text += FOOTER
+
+    # Create pagination buttons
+    keyboard = []
+    if page > 1:
+        keyboard.append(InlineKeyboardButton("◀️ Previous", callback_data=f"leaderboard_page_{page-1}"))
+    keyboard.append(InlineKeyboardButton("🔄 Refresh", callback_data=f"leaderboard_page_{page}"))
+    if page_data.get('has_more'):
+        keyboard.append(InlineKeyboardButton("Next ▶️", callback_data=f"leaderboard_page_{page+1}"))
+
+    rows = [keyboard]
+    # Add jump to my position button if user is in leaderboard
+    if user_position:
+        keyboard.append(InlineKeyboardButton("📍 My Rank", callback_data=f"leaderboard_jump_{user_position}"))
+        rows.append([InlineKeyboardButton("🎯 Around Me", callback_data="leaderboard_around")])
+
+    return text, InlineKeyboardMarkup(rows)
+
+
+def render_around(page_data: Dict, first_rank: int, user_id: Any, user_rank: int) -> Tuple[str, InlineKeyboardMarkup]:
+    """Compact view of the players ranked just above and below the user"""
+    text = f"<b>🎯 Around You</b>\n"
+    if page_data['total'] is not None:
+        text += f"<i>{page_data['total']} players</i>\n\n"
+    else:
+        text += "\n"
+
+    for position, entry in enumerate(page_data['entries'], first_rank):
+        username = _format_username(entry)
+        score = entry.get('score', 0)
+        if entry.get('id') == user_id:
+            text += f"{position}. <b>{username} - {score} pts 👈 YOU</b>\n"
+        else:
+            text += f"{position}. {username} - {score} pts\n"
+
+    text += FOOTER
+
+    user_page = ((user_rank - 1) // LEADERBOARD_PAGE_SIZE) + 1
+    keyboard = [
+        InlineKeyboardButton("🏆 Top Players", callback_data="leaderboard_page_1"),
+        InlineKeyboardButton("📄 My Page", callback_data=f"leaderboard_page_{user_page}"),
+        InlineKeyboardButton("🔄 Refresh", callback_data="leaderboard_around"),
+    ]
+    return text, InlineKeyboardMarkup([keyboard])
+
+
+def render_digest(text: str, reply_markup: Optional[InlineKeyboardMarkup]) -> str:
+    """Short fingerprint of a rendered message, used to skip no-op edits"""
+    digest = hashlib.blake2b(text.encode(), digest_size=16)
+    if reply_markup is not None:
+        digest.update(reply_markup.to_json().encode())
+    return digest.hexdigest()
+
+
+def page_cache_stats() -> Dict[str, Any]:
+    return _page_cache.stats()
@@ -1,11 +1,17 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import os
-import asyncio
+import hmac
 import logging
-import json
 from telegram import Update
+import fastjson
 from contextlib import asynccontextmanager
+from update_queue import UpdateQueue, WEBHOOK_MODE
+from dispatcher import dispatch_queued_update, dispatch_update
+from dedup import create_dedup_backend
+from background import REQUEST_SCOPED, background
+from write_behind import user_writes
+from metrics import CONTENT_TYPE, METRICS_TOKEN, registry
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -17,17 +23,31 @@ print("🚀 Initializing Gomida Games Bot...")
 
 application = None
 BOT_TOKEN = None
+update_queue = None
+update_dedup = create_dedup_backend()
+
+# Update types our handlers consume (commands/text/contact arrive as messages)
+HANDLED_UPDATE_TYPES = frozenset(
+    t.strip() for t in os.getenv("HANDLED_UPDATE_TYPES", "message,edited_message,callback_query").split(",") if t.strip()
+)
+# Telegram echoes this back in X-Telegram-Bot-Api-Secret-Token on every webhook call
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and Shutdown logic for FastAPI."""
-    global application, BOT_TOKEN
+    global application, BOT_TOKEN, update_queue
 
-    from bot_setup import application as bot_app, BOT_TOKEN as token
-    application = bot_app
+    from bot_setup import get_application, BOT_TOKEN as token
+    from api_client import init_client, close_client
+    from webhook_manager import ensure_webhook
+    application = get_application()
     BOT_TOKEN = token
 
+    # One pooled backend client shared by every api_client call
+    await init_client()
+
     webhook_url = os.getenv("WEBHOOK_URL", "")
     is_production = os.getenv("ENVIRONMENT", "development") == "production"
 
@@ -35,14 +55,11 @@ async def lifespan(app: FastAPI):
 
     if is_production and webhook_url:
         try:
-            print("🔄 Removing old webhook...")
-            await application.bot.delete_webhook()
-
-            print("🔄 Setting new webhook...")
-            await application.bot.set_webhook(webhook_url)
-
-            info = await application.bot.get_webhook_info()
-            print(f"✅ Webhook set to: {info.url}")
+            # Only talks to the Bot API when the webhook config actually changed
+            result = await ensure_webhook(
+                application.bot, webhook_url, HANDLED_UPDATE_TYPES, WEBHOOK_SECRET or None
+            )
+            print(f"✅ Webhook {result}: {webhook_url}")
 
         except Exception as e:
             print(f"❌ Webhook setup failed: {e}")
@@ -53,8 +70,29 @@ async def lifespan(app: FastAPI):
     await application.start()
     print("✅ Bot is running and accepting updates!")
 
+    if WEBHOOK_MODE == "queue":
+        # Ack webhooks immediately and process updates on a worker pool; a worker never waits
+        # behind another update from the same user
+        update_queue = UpdateQueue(lambda update: dispatch_queued_update(application, update))
+        await update_queue.start()
+
     yield
 
+    if update_queue:
+        await update_queue.stop()
+        update_queue = None
+
+    # Checkpoint a running broadcast so /broadcast_resume can pick it up after restart
+    from broadcast import stop_broadcast
+    await stop_broadcast()
+
+    # Let side effects of already-answered updates finish (they may queue digests and writes)
+    await background.close()
+
+    # Send any buffered admin digest while the bot can still talk to Telegram
+    from notifications import notification_digest
+    await notification_digest.close()
+
     # 🔥 CLEAN SHUTDOWN
     print("🛑 Stopping bot gracefully...")
     try:
@@ -64,25 +102,130 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"❌ Error during shutdown: {e}")
 
+    # Buffered user updates must reach the backend before the client goes away
+    await user_writes.close()
+
+    await close_client()
+
 
 app = FastAPI(title="Gomida Games Bot", lifespan=lifespan)
 
 
+def _cache_stats():
+    """Hits and misses of the caches handlers read through"""
+    from api_client import profile_cache_stats
+    from leaderboard import leaderboard_cache
+    from leaderboard_view import page_cache_stats
+
+    leaderboard = leaderboard_cache.stats()
+    return {
+        "profiles": profile_cache_stats(),
+        "leaderboard": {"hits": leaderboard["hits"] + leaderboard["stale_hits"], "misses": leaderboard["misses"]},
+        "leaderboard_pages": page_cache_stats(),
+    }
+
+
+def _circuit_open():
+    from api_client import backend_breaker_stats
+    return backend_breaker_stats()["state"] != "closed"
+
+
+def _hit_ratio(stats):
+    lookups = stats["hits"] + stats["misses"]
+    return stats["hits"] / lookups if lookups else 0.0
+
+
+# Sampled at scrape time from the state /info reports, nothing extra on the request path
+registry.gauge_callback(
+    "webhook_queue_depth", "Updates waiting in the webhook queue",
+    lambda: update_queue.metrics()["depth"] if update_queue else 0,
+)
+registry.gauge_callback(
+    "webhook_queue_busy_workers", "Webhook queue workers processing an update",
+    lambda: update_queue.busy if update_queue else 0,
+)
+registry.gauge_callback(
+    "updates_in_flight", "Updates currently being handled",
+    lambda: application.update_processor.in_flight if application else 0,
+)
+registry.gauge_callback(
+    "bot_api_queued_requests", "Bot API requests waiting for the rate limiter, by lane",
+    lambda: application.bot.rate_limiter.metrics()["queued"] if application and application.bot.rate_limiter else {},
+    ("lane",),
+)
+registry.counter_callback(
+    "cache_hits", "Cache hits", lambda: {name: s["hits"] for name, s in _cache_stats().items()}, ("cache",)
+)
+registry.counter_callback(
+    "cache_misses", "Cache misses", lambda: {name: s["misses"] for name, s in _cache_stats().items()}, ("cache",)
+)
+registry.gauge_callback(
+    "cache_hit_ratio", "Cache hit ratio since start",
+    lambda: {name: _hit_ratio(s) for name, s in _cache_stats().items()}, ("cache",)
+)
+registry.gauge_callback(
+    "background_tasks_running", "Background tasks scheduled or running", lambda: background.stats()["running"]
+)
+registry.gauge_callback(
+    "user_writes_pending", "Buffered user updates not yet written", lambda: user_writes.stats()["pending"]
+)
+registry.gauge_callback("backend_circuit_open", "1 while the backend circuit breaker is not closed", _circuit_open)
+
+
 @app.post("/webhook")
 async def telegram_webhook(request: Request):
     if not application:
         return JSONResponse({"error": "Application not initialized"}, status_code=500)
 
+    if WEBHOOK_SECRET:
+        received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(received, WEBHOOK_SECRET):
+            return JSONResponse({"error": "Forbidden"}, status_code=403)
+
+    update_id = None
     try:
         body = await request.body()
-        data = json.loads(body)
+        try:
+            data = fastjson.loads(body)
+        except ValueError:
+            return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+        if not isinstance(data, dict) or "update_id" not in data:
+            return JSONResponse({"error": "Invalid update"}, status_code=400)
+
+        # Nothing is registered for other update types, don't build objects for them
+        if HANDLED_UPDATE_TYPES.isdisjoint(data):
+            return JSONResponse({"status": "ignored"})
+
+        # Telegram redelivers updates we were slow to ack: skip those before any parsing
+        update_id = data["update_id"]
+        if await update_dedup.seen(update_id):
+            return JSONResponse({"status": "duplicate"})
 
         update = Update.de_json(data, application.bot)
-        await application.process_update(update)
+
+        if update_queue:
+            if not await update_queue.put(update):
+                # Non-2xx makes Telegram redeliver later instead of us losing the update
+                await update_dedup.forget(update_id)
+                return JSONResponse({"error": "Update queue full"}, status_code=503)
+            return JSONResponse({"status": "queued"})
+
+        await dispatch_update(application, update)
+
+        if REQUEST_SCOPED == "on":
+            # The runtime freezes once we respond (and with it any digest timer): finish side
+            # effects, buffered writes and admin notifications first
+            from notifications import notification_digest
+            await background.drain()
+            await user_writes.flush()
+            await notification_digest.flush()
 
         return JSONResponse({"status": "ok"})
 
     except Exception as e:
+        if update_id is not None:
+            # Let Telegram's retry through, we never finished this one
+            await update_dedup.forget(update_id)
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
@@ -98,11 +241,30 @@ async def home():
     }
 
 
+@app.get("/metrics")
+async def metrics(request: Request):
+    if METRICS_TOKEN:
+        received = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(received, f"Bearer {METRICS_TOKEN}"):
+            return JSONResponse({"error": "Forbidden"}, status_code=403)
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/info")
 async def info():
     if not application:
         return {"error": "Bot not initialized"}
 
+    from api_client import (
+        backend_breaker_stats, backend_latency_stats, conditional_stats, profile_cache_stats, route_stats,
+        user_write_stats,
+    )
+    from deadlines import budget_stats
+    from games import catalog
+    from leaderboard import leaderboard_cache
+    from leaderboard_view import page_cache_stats
+    from notifications import notification_digest
+
     try:
         bot = await application.bot.get_me()
         webhook = await application.bot.get_webhook_info()
@@ -115,6 +277,25 @@ async def info():
             "webhook": {
                 "url": webhook.url,
                 "pending": webhook.pending_update_count
+            },
+            "queue": update_queue.metrics() if update_queue else {"mode": "inline"},
+            "dispatcher": application.update_processor.metrics(),
+            "dedup": update_dedup.stats(),
+            "persistence": application.persistence.stats() if application.persistence else None,
+            "admin_notifications": notification_digest.stats(),
+            "rate_limiter": application.bot.rate_limiter.metrics() if application.bot.rate_limiter else None,
+            "backend_breaker": backend_breaker_stats(),
+            "backend_latency": backend_latency_stats(),
+            "backend_routes": route_stats(),
+            "conditional_gets": conditional_stats(),
+            "user_writes": {**user_write_stats(), "buffer": user_writes.stats()},
+            "handler_budgets": budget_stats(),
+            "background": background.stats(),
+            "games": catalog.stats(),
+            "cache": {
+                "profiles": profile_cache_stats(),
+                "leaderboard": leaderboard_cache.stats(),
+                "leaderboard_pages": page_cache_stats()
             }
         }
     except Exception as e:
@@ -129,7 +310,8 @@ if __name__ == "__main__":
     print("🚀 DEVELOPMENT MODE — USING POLLING (no webhook)")
 
     # Import bot_setup manually (creates application)
-    from bot_setup import application as bot_app
+    from bot_setup import get_application
+    bot_app = get_application()
 
     # Start polling directly (no initialize(), no async)
     bot_app.run_polling()
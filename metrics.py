@@ -0,0 +1,238 @@
+# metrics.py
+import bisect
+import math
+import os
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Optional bearer token for /metrics (leave empty on a private network / behind the scraper's auth)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "gomida")
+
+# Seconds; covers a cache hit (~ms) up to a backend call that exhausted its timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Everything is recorded from the event loop thread and no recording awaits, so plain
+# list/dict increments are atomic with respect to other coroutines: no locks needed.
+
+
+class Histogram:
+    """Fixed-bucket histogram; the count list is allocated once and only ever incremented"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # First bound >= value, i.e. Prometheus "le" semantics
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Family:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+
+class HistogramFamily(_Family):
+    """Histograms by label values; hot callers hold on to the child from labels()"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: Any) -> Histogram:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = Histogram(self.buckets)
+        return child
+
+    def preallocate(self, *label_sets: Iterable[Any]) -> "HistogramFamily":
+        """Create children up front so known series are exported (as zeros) from the first scrape"""
+        for values in label_sets:
+            self.labels(*values)
+        return self
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for key, child in self._children.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            cumulative += child.counts[-1]
+            yield "_bucket", {**labels, "le": "+Inf"}, cumulative
+            yield "_sum", labels, child.sum
+            yield "_count", labels, cumulative
+
+
+class CounterFamily(_Family):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *values: Any, amount: float = 1) -> None:
+        key = tuple(str(v) for v in values)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for key, value in self._values.items():
+            yield "_total", dict(zip(self.labelnames, key)), value
+
+
+class CallbackFamily(_Family):
+    """Read at scrape time from state the app already keeps, so it costs nothing per request"""
+
+    def __init__(self, name: str, kind: str, help: str, read: Callable[[], Any], labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self._read = read
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        suffix = "_total" if self.kind == "counter" else ""
+        value = self._read()
+        if not isinstance(value, dict):
+            yield suffix, {}, value
+            return
+        for key, v in value.items():
+            key = key if isinstance(key, tuple) else (key,)
+            yield suffix, dict(zip(self.labelnames, (str(k) for k in key))), v
+
+
+def _format_value(value: float) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """All metric families, rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._families: Dict[str, _Family] = {}
+        self.scrape_errors = 0
+
+    def _add(self, family: _Family) -> _Family:
+        # Registering a name again keeps the existing recorders; readers are replaced
+        existing = self._families.get(family.name)
+        if existing is not None and not isinstance(family, CallbackFamily):
+            return existing
+        self._families[family.name] = family
+        return family
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> HistogramFamily:
+        return self._add(HistogramFamily(name, help, labelnames, buckets))
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> CounterFamily:
+        return self._add(CounterFamily(name, help, labelnames))
+
+    def gauge_callback(self, name: str, help: str, read: Callable[[], Any], labelnames: Sequence[str] = ()) -> None:
+        self._add(CallbackFamily(name, "gauge", help, read, labelnames))
+
+    def counter_callback(self, name: str, help: str, read: Callable[[], Any], labelnames: Sequence[str] = ()) -> None:
+        self._add(CallbackFamily(name, "counter", help, read, labelnames))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families.values():
+            try:
+                samples = list(family.samples())
+            except Exception as e:
+                # A broken reader must not take the whole scrape down
+                self.scrape_errors += 1
+                logger.error(f"❌ Could not collect metric {family.name}: {e}")
+                continue
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for suffix, labels, value in samples:
+                if labels:
+                    rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                    lines.append(f"{family.name}{suffix}{{{rendered}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{family.name}{suffix} {_format_value(value)}")
+        lines.append(f"# HELP {METRICS_PREFIX}_metrics_scrape_errors Metric families that failed to render")
+        lines.append(f"# TYPE {METRICS_PREFIX}_metrics_scrape_errors counter")
+        lines.append(f"{METRICS_PREFIX}_metrics_scrape_errors_total {self.scrape_errors}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Handler latency per update kind (see dispatcher.handler_label)
+handler_latency = registry.histogram(
+    "handler_duration_seconds", "Time to process an update, by handler", ("handler",)
+)
+# Backend calls by logical endpoint ("/users/{id}"), including retries
+backend_latency = registry.histogram(
+    "backend_request_duration_seconds", "Backend call latency including retries", ("endpoint", "method")
+)
+backend_requests = registry.counter(
+    "backend_requests", "Backend calls by final HTTP status or error kind", ("endpoint", "method", "status")
+)
+backend_timeouts = registry.counter(
+    "backend_timeouts", "Backend calls that ended in a timeout", ("endpoint", "method")
+)
+# Bot API calls as sent over the wire (after rate limiting)
+bot_api_latency = registry.histogram(
+    "bot_api_request_duration_seconds", "Bot API HTTP request latency", ("method",)
+)
+bot_api_requests = registry.counter(
+    "bot_api_requests", "Bot API HTTP requests by status code or error kind", ("method", "status")
+)
+
+
+def record_backend(endpoint: str, method: str, started: float, status: Any) -> None:
+    backend_latency.labels(endpoint, method).observe(time.monotonic() - started)
+    backend_requests.inc(endpoint, method, status)
+    if status == "timeout":
+        backend_timeouts.inc(endpoint, method)
+
+
+class TimedHTTPXRequest(HTTPXRequest):
+    """The bot's HTTP transport, timing every Bot API call by method"""
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        started = time.monotonic()
+        status: Any = "error"
+        try:
+            code, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+            status = code
+            return code, payload
+        except TimedOut:
+            status = "timeout"
+            raise
+        finally:
+            bot_api_latency.labels(api_method).observe(time.monotonic() - started)
+            bot_api_requests.inc(api_method, status)
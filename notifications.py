@@ -1,7 +1,13 @@
 # notifications.py
 import os
+import asyncio
+import html
 import logging
-from typing import List
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from background import background
 
 logger = logging.getLogger(__name__)
 
@@ -45,4 +51,128 @@ async def send_registration_notification(bot, new_user_username: str, new_user_p
             # For now, we'll just log it
             
         except Exception as e:
-            logger.error(f"❌ Failed to send notification to {admin_phone}: {e}")
\ No newline at end of file
+            logger.error(f"❌ Failed to send notification to {admin_phone}: {e}")
+
+# ---------------------------------------------------------------------------------------
+# Admin group digests
+# ---------------------------------------------------------------------------------------
+
+# "digest" batches admin-group events into periodic summaries, "immediate" sends two messages per event
+ADMIN_NOTIFY_MODE = os.getenv("ADMIN_NOTIFY_MODE", "digest").lower()
+ADMIN_DIGEST_INTERVAL = float(os.getenv("ADMIN_DIGEST_INTERVAL", "30"))
+ADMIN_DIGEST_MAX_EVENTS = int(os.getenv("ADMIN_DIGEST_MAX_EVENTS", "25"))
+# Telegram rejects messages over 4096 characters, leave room for the header
+TELEGRAM_MESSAGE_LIMIT = 4000
+
+
+class NotificationDigest:
+    """Buffers admin-group events and sends them as one digest every N seconds or N events"""
+
+    def __init__(self, interval: float = ADMIN_DIGEST_INTERVAL, max_events: int = ADMIN_DIGEST_MAX_EVENTS):
+        self.interval = interval
+        self.max_events = max_events
+        self._bot = None
+        self._chat_id: Optional[int] = None
+        # (user_id, event_type) -> event; repeats of the same event for a user are merged
+        self._events: "OrderedDict[Tuple[Any, str], Dict[str, Any]]" = OrderedDict()
+        self._timer: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.events_received = 0
+        self.events_merged = 0
+        self.digests_sent = 0
+
+    def add(self, bot, chat_id: int, user_id: Any, username: str, phone: str, event_type: str, details: str = "") -> None:
+        """Queue an event; never blocks the caller on network I/O"""
+        self._bot, self._chat_id = bot, chat_id
+        self.events_received += 1
+
+        key = (user_id, event_type)
+        existing = self._events.get(key)
+        if existing:
+            existing['count'] += 1
+            existing.update(username=username, phone=phone, time=datetime.now(), details=details)
+            self.events_merged += 1
+        else:
+            self._events[key] = {
+                'user_id': user_id,
+                'username': username,
+                'phone': phone,
+                'event_type': event_type,
+                'details': details,
+                'time': datetime.now(),
+                'count': 1,
+            }
+
+        if len(self._events) >= self.max_events:
+            # Tracked, so the send isn't garbage-collected halfway
+            background.spawn(self.flush(), name="admin_digest_flush")
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.interval)
+        await self.flush()
+
+    def _render(self, events) -> list:
+        """Digest text split into chunks that fit Telegram's message limit"""
+        header = f"🎮 <b>GOMIDA GAMES DIGEST</b> — {len(events)} events\n\n"
+        lines = []
+        for event in events:
+            username = f"@{event['username']}" if event['username'] else "No username"
+            line = (
+                f"• <b>{html.escape(event['event_type'])}</b> "
+                f"<code>{html.escape(str(event['user_id']))}</code> {html.escape(username)}"
+                f" · 📞 <code>{html.escape(event['phone'] or 'Not shared')}</code>"
+                f" · {event['time'].strftime('%H:%M:%S')}"
+            )
+            if event['count'] > 1:
+                line += f" · ×{event['count']}"
+            if event['details']:
+                line += f" · {html.escape(event['details'])}"
+            lines.append(line + "\n")
+        footer = "\n#Digest #GomidaGames"
+
+        chunks, current = [], header
+        for line in lines:
+            if len(current) + len(line) + len(footer) > TELEGRAM_MESSAGE_LIMIT:
+                chunks.append(current + footer)
+                current = "🎮 <b>DIGEST (continued)</b>\n\n"
+            current += line
+        chunks.append(current + footer)
+        return chunks
+
+    async def flush(self) -> None:
+        """Send everything buffered so far"""
+        async with self._flush_lock:
+            if not self._events or self._bot is None:
+                return
+            events = list(self._events.values())
+            self._events.clear()
+            bot, chat_id = self._bot, self._chat_id
+
+            for chunk in self._render(events):
+                try:
+                    await bot.send_message(chat_id=chat_id, text=chunk, parse_mode='HTML')
+                    self.digests_sent += 1
+                except Exception as e:
+                    logger.error(f"❌ Failed to send digest to group {chat_id}: {e}")
+                    logger.info(f"📨 Would have sent to group {chat_id}: {chunk}")
+            logger.info(f"✅ Digest with {len(events)} events sent to admin group {chat_id}")
+
+    async def close(self) -> None:
+        """Flush on shutdown and stop the timer"""
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": ADMIN_NOTIFY_MODE,
+            "buffered": len(self._events),
+            "events_received": self.events_received,
+            "events_merged": self.events_merged,
+            "digests_sent": self.digests_sent,
+        }
+
+
+notification_digest = NotificationDigest()
@@ -0,0 +1,248 @@
+# persistence.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+# "sqlite" keeps context.user_data across restarts, "none" keeps it in memory only
+PERSISTENCE = os.getenv("PERSISTENCE", "sqlite").lower()
+# /tmp is the only writable path on serverless hosts, but it only lives as long as the instance:
+# on request-scoped hosts (Vercel) a cold start begins with an empty store. Point this at a
+# mounted volume where the host has one.
+PERSISTENCE_PATH = os.getenv("PERSISTENCE_PATH", "/tmp/gomida_user_data.sqlite3")
+# Seconds a profile kept in user_data is trusted before handlers re-read it from the backend
+API_USER_MAX_AGE = float(os.getenv("API_USER_MAX_AGE", "600"))
+# How often PTB hands us changed user_data (seconds)
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "10"))
+# Max users whose user_data is kept loaded in memory
+PERSISTENCE_WORKING_SET = int(os.getenv("PERSISTENCE_WORKING_SET", "5000"))
+
+
+def remember_api_user(user_data: Dict[Any, Any], api_user: Dict[str, Any]) -> None:
+    """Store the backend profile in user_data together with when it was fetched"""
+    user_data['api_user'] = api_user
+    user_data['api_user_fetched_at'] = time.time()
+
+
+def api_user_is_stale(user_data: Dict[Any, Any]) -> bool:
+    """True when there's no profile in user_data or it's older than API_USER_MAX_AGE"""
+    if 'api_user' not in user_data:
+        return True
+    return time.time() - float(user_data.get('api_user_fetched_at') or 0) > API_USER_MAX_AGE
+
+
+class SQLiteUserDataPersistence(BasePersistence):
+    """
+    Stores context.user_data in SQLite (WAL mode).
+
+    Nothing is loaded at startup: a user's data is read the first time one of their updates
+    is processed, and only the PERSISTENCE_WORKING_SET most recently active users stay loaded.
+    Changed data is staged and written in one transaction per flush.
+    """
+
+    def __init__(
+        self,
+        path: str = PERSISTENCE_PATH,
+        update_interval: float = PERSISTENCE_FLUSH_INTERVAL,
+        working_set: int = PERSISTENCE_WORKING_SET,
+    ):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self.working_set = working_set
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        # user_id -> the live user_data dict PTB handed us, most recently used last
+        self._loaded: "OrderedDict[int, Dict]" = OrderedDict()
+        # user_id -> serialized data (None = delete) waiting for the next write
+        self._pending: Dict[int, Optional[str]] = {}
+        self._write_lock = asyncio.Lock()
+        self._write_task: Optional[asyncio.Task] = None
+        # Whether a user has an update (or in-order background work) running; wired to the
+        # update processor in bot_setup. Those users' dicts are in use and never unloaded.
+        self.is_busy: Callable[[int], bool] = lambda user_id: False
+        self.loads = 0
+        self.writes = 0
+        self.evictions = 0
+        self.busy_skips = 0
+
+    # --- lazy loading -------------------------------------------------------------------
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        # Loaded per user on first use in refresh_user_data instead
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        if user_id in self._loaded:
+            self._loaded.move_to_end(user_id)
+            return
+
+        stored = self._read(user_id)
+        if stored and api_user_is_stale(stored):
+            # Scores and stars moved on while we were down: let handlers re-read the profile
+            stored.pop('api_user', None)
+            stored.pop('api_user_fetched_at', None)
+        if stored:
+            # Anything already set in memory is newer than what's on disk
+            for key, value in stored.items():
+                user_data.setdefault(key, value)
+            self.loads += 1
+
+        self._loaded[user_id] = user_data
+        self._evict()
+
+    def _read(self, user_id: int) -> Optional[Dict]:
+        if user_id in self._pending:
+            raw = self._pending[user_id]
+        else:
+            row = self._conn.execute("SELECT data FROM user_data WHERE user_id = ?", (user_id,)).fetchone()
+            raw = row[0] if row else None
+        return json.loads(raw) if raw else None
+
+    def _evict(self) -> None:
+        """Unload least recently active users; their data is staged first so nothing is lost"""
+        excess = len(self._loaded) - self.working_set
+        if excess <= 0:
+            return
+        victims = []
+        for user_id in self._loaded:
+            if len(victims) >= excess:
+                break
+            if self.is_busy(user_id):
+                # A handler may still read or write this dict: clearing it now would lose data
+                self.busy_skips += 1
+                continue
+            victims.append(user_id)
+        for user_id in victims:
+            user_data = self._loaded.pop(user_id)
+            if user_data:
+                self._pending[user_id] = json.dumps(user_data, default=str)
+                self._schedule_write()
+                user_data.clear()
+            self.evictions += 1
+
+    # --- writes -------------------------------------------------------------------------
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        if user_id not in self._loaded and not data:
+            # An evicted user's cleared dict; the real data was staged on eviction
+            return
+        self._pending[user_id] = json.dumps(data, default=str)
+        self._schedule_write()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._loaded.pop(user_id, None)
+        self._pending[user_id] = None
+        self._schedule_write()
+
+    def _schedule_write(self) -> None:
+        # PTB hands over all changed users in one burst, collect them into a single transaction
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_soon())
+
+    async def _write_soon(self) -> None:
+        await asyncio.sleep(0.1)
+        await self.flush()
+
+    def _write(self, batch: Dict[int, Optional[str]]) -> None:
+        upserts = [(user_id, raw) for user_id, raw in batch.items() if raw is not None]
+        deletes = [(user_id,) for user_id, raw in batch.items() if raw is None]
+        with self._conn:
+            self._conn.execute("BEGIN")
+            if upserts:
+                self._conn.executemany(
+                    "INSERT INTO user_data (user_id, data) VALUES (?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+                    upserts,
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM user_data WHERE user_id = ?", deletes)
+
+    async def flush(self) -> None:
+        async with self._write_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(self._write, batch)
+                self.writes += 1
+                logger.debug(f"💾 Persisted user_data for {len(batch)} users")
+            except sqlite3.Error as e:
+                logger.error(f"❌ Failed to persist user_data for {len(batch)} users: {e}")
+                # Keep the batch for the next flush unless newer data arrived meanwhile
+                for user_id, raw in batch.items():
+                    self._pending.setdefault(user_id, raw)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "loaded": len(self._loaded),
+            "working_set": self.working_set,
+            "pending": len(self._pending),
+            "loads": self.loads,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "busy_skips": self.busy_skips,
+        }
+
+    # --- unused stores ------------------------------------------------------------------
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> Dict:
+        return {}
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        pass
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        pass
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+
+def create_persistence() -> Optional[SQLiteUserDataPersistence]:
+    """Build the persistence selected by PERSISTENCE, None to keep user_data in memory only"""
+    if PERSISTENCE == "none":
+        return None
+    if PERSISTENCE != "sqlite":
+        logger.warning(f"⚠️ Unknown PERSISTENCE {PERSISTENCE!r}, using sqlite")
+    if os.getenv("VERCEL") and PERSISTENCE_PATH.startswith("/tmp/"):
+        logger.warning(f"⚠️ {PERSISTENCE_PATH} does not survive cold starts here, set PERSISTENCE_PATH to a volume")
+    try:
+        return SQLiteUserDataPersistence()
+    except sqlite3.Error as e:
+        logger.error(f"❌ Could not open user_data store {PERSISTENCE_PATH}: {e}, keeping user_data in memory")
+        return None
@@ -0,0 +1,233 @@
+# rate_limiter.py
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Telegram's documented limits: ~30 messages/s overall, ~1/s per chat, 20/min per group
+RATE_LIMIT_GLOBAL_PER_SEC = float(os.getenv("RATE_LIMIT_GLOBAL_PER_SEC", "30"))
+RATE_LIMIT_CHAT_PER_SEC = float(os.getenv("RATE_LIMIT_CHAT_PER_SEC", "1"))
+RATE_LIMIT_CHAT_BURST = float(os.getenv("RATE_LIMIT_CHAT_BURST", "3"))
+RATE_LIMIT_GROUP_PER_MIN = float(os.getenv("RATE_LIMIT_GROUP_PER_MIN", "20"))
+RATE_LIMIT_GROUP_BURST = float(os.getenv("RATE_LIMIT_GROUP_BURST", "5"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "2"))
+RATE_LIMIT_MAX_CHATS = int(os.getenv("RATE_LIMIT_MAX_CHATS", "10000"))
+
+# Priority lanes for the global bucket, lowest number is served first
+LANES = {"user": 0, "admin": 1, "bulk": 2}
+
+
+class TokenBucket:
+    """Classic token bucket; take() returns 0 on success or the seconds to wait for a token"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def take(self) -> float:
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def block(self, seconds: float) -> None:
+        """Honor a flood-control retry_after from Telegram"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        elapsed = time.monotonic() - self.updated
+        return self.tokens + elapsed * self.rate >= self.capacity and time.monotonic() >= self.blocked_until
+
+
+class PriorityGate:
+    """A token bucket whose waiters are served strictly by lane priority, FIFO within a lane"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self._lanes: List[Deque[asyncio.Future]] = [deque() for _ in LANES]
+        self._pump_task: Optional[asyncio.Task] = None
+
+    def _waiting(self) -> bool:
+        return any(self._lanes)
+
+    async def acquire(self, lane: int) -> None:
+        if not self._waiting() and self.bucket.take() == 0:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[lane].append(future)
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        await future
+
+    async def _pump(self) -> None:
+        while self._waiting():
+            wait = self.bucket.take()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            for lane in self._lanes:
+                # Skip waiters that gave up (cancelled) without spending the token on them
+                while lane and lane[0].done():
+                    lane.popleft()
+                if lane:
+                    lane.popleft().set_result(None)
+                    break
+            else:
+                # Everyone left; give the token back
+                self.bucket.tokens = min(self.bucket.capacity, self.bucket.tokens + 1)
+
+    def depth(self) -> Dict[str, int]:
+        return {name: len(self._lanes[i]) for name, i in LANES.items()}
+
+    @property
+    def idle(self) -> bool:
+        return not self._waiting() and self.bucket.idle
+
+
+class PriorityRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """
+    Paces outbound Bot API requests with a global bucket plus per-chat / per-group buckets.
+
+    Requests are put in lanes: replies to users go first, admin-group traffic and bulk sends
+    (broadcasts) wait behind them. Pass rate_limit_args={"lane": "bulk"} to pick a lane
+    explicitly; otherwise the admin group is "admin" and everything else "user". Sends to
+    one chat queue in arrival order (per lane), so a chat's messages don't overtake each other.
+    """
+
+    def __init__(self, admin_chat_id: Optional[int] = None):
+        self.admin_chat_id = admin_chat_id
+        self._global = PriorityGate(TokenBucket(RATE_LIMIT_GLOBAL_PER_SEC, RATE_LIMIT_GLOBAL_PER_SEC))
+        self._chats: "OrderedDict[Any, PriorityGate]" = OrderedDict()
+        # (chat, monotonic time) of the last flood-control pause, to spot a bot-wide one
+        self._last_flood: Optional[Tuple[Any, float]] = None
+        self.requests = 0
+        self.throttled = 0
+        self.retry_afters = 0
+        self.global_pauses = 0
+        self._wait_total = {name: 0.0 for name in LANES}
+        self._wait_max = {name: 0.0 for name in LANES}
+        self._wait_count = {name: 0 for name in LANES}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _lane(self, chat_id: Any, rate_limit_args: Optional[Dict[str, Any]]) -> str:
+        if rate_limit_args and rate_limit_args.get("lane") in LANES:
+            return rate_limit_args["lane"]
+        if self.admin_chat_id is not None and str(chat_id) == str(self.admin_chat_id):
+            return "admin"
+        return "user"
+
+    def _chat_gate(self, chat_id: Any) -> PriorityGate:
+        gate = self._chats.get(chat_id)
+        if gate is None:
+            # Negative ids (and @channel usernames) are groups/channels with the stricter limit
+            is_group = (isinstance(chat_id, str) and not chat_id.lstrip("-").isdigit()) or int(chat_id) < 0
+            if is_group:
+                bucket = TokenBucket(RATE_LIMIT_GROUP_PER_MIN / 60, RATE_LIMIT_GROUP_BURST)
+            else:
+                bucket = TokenBucket(RATE_LIMIT_CHAT_PER_SEC, RATE_LIMIT_CHAT_BURST)
+            gate = self._chats[chat_id] = PriorityGate(bucket)
+            self._trim_chats()
+        self._chats.move_to_end(chat_id)
+        return gate
+
+    def _trim_chats(self) -> None:
+        if len(self._chats) <= RATE_LIMIT_MAX_CHATS:
+            return
+        for chat_id in list(self._chats):
+            if len(self._chats) <= RATE_LIMIT_MAX_CHATS:
+                break
+            if self._chats[chat_id].idle:
+                del self._chats[chat_id]
+
+    async def _wait_for_slot(self, chat_id: Any, lane: str) -> None:
+        started = time.monotonic()
+        await self._chat_gate(chat_id).acquire(LANES[lane])
+        await self._global.acquire(LANES[lane])
+
+        waited = time.monotonic() - started
+        self._wait_total[lane] += waited
+        self._wait_count[lane] += 1
+        self._wait_max[lane] = max(self._wait_max[lane], waited)
+        if waited > 0.001:
+            self.throttled += 1
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            # Not a chat-bound call (getMe, answerCallbackQuery, webhooks...): no pacing needed
+            return await callback(*args, **kwargs)
+
+        self.requests += 1
+        lane = self._lane(chat_id, rate_limit_args)
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            await self._wait_for_slot(chat_id, lane)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self.retry_afters += 1
+                retry_after = e.retry_after
+                seconds = retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+                self._pause(chat_id, seconds)
+                logger.warning(f"⚠️ Flood control on {endpoint} for chat {chat_id}, retrying in {seconds:.0f}s")
+                if attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+
+    def _pause(self, chat_id: Any, seconds: float) -> None:
+        """Pause the chat; when another chat is still paused too, it's the bot-wide limit"""
+        now = time.monotonic()
+        self._chat_gate(chat_id).bucket.block(seconds)
+        last = self._last_flood
+        if last is not None and last[0] != chat_id and now < last[1]:
+            self._global.bucket.block(seconds)
+            self.global_pauses += 1
+            logger.warning(f"⚠️ Flood control on several chats at once, pausing all sends for {seconds:.0f}s")
+        self._last_flood = (chat_id, now + seconds)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retry_afters": self.retry_afters,
+            "global_pauses": self.global_pauses,
+            "tracked_chats": len(self._chats),
+            "queued": self._global.depth(),
+            "wait_ms": {
+                lane: {
+                    "avg": round(self._wait_total[lane] / self._wait_count[lane] * 1000, 1) if self._wait_count[lane] else 0.0,
+                    "max": round(self._wait_max[lane] * 1000, 1),
+                }
+                for lane in LANES
+            },
+        }
@@ -0,0 +1,244 @@
+# resilience.py
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Retries for idempotent requests (GET/PUT); exponential backoff with full jitter
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", "2"))
+BACKEND_BACKOFF_BASE = float(os.getenv("BACKEND_BACKOFF_BASE", "0.25"))
+BACKEND_BACKOFF_MAX = float(os.getenv("BACKEND_BACKOFF_MAX", "4.0"))
+# No new attempt is started once a call has been going for this long
+BACKEND_RETRY_BUDGET = float(os.getenv("BACKEND_RETRY_BUDGET", "20"))
+
+# Circuit breaker: open after N consecutive failures, probe again after the cooldown
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+# Hedged reads: fire a second request once the first is slower than the observed p95
+BACKEND_HEDGED_READS = os.getenv("BACKEND_HEDGED_READS", "true").lower() in ("1", "true", "yes")
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "2.0"))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the backend while the breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures. While open every call fails
+    fast; after `reset_timeout` one probe is let through (half-open) and its outcome decides
+    whether the breaker closes again or re-opens.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self.rejected = 0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        # A probe that never reported back (e.g. cancelled) doesn't block the next one forever
+        probe_stale = time.monotonic() - self._probe_started >= self.reset_timeout
+        if self.state == self.HALF_OPEN and (not self._probing or probe_stale):
+            self._probing = True
+            self._probe_started = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"✅ Circuit '{self.name}' closed, backend is responding again")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+                logger.warning(
+                    f"⚠️ Circuit '{self.name}' open after {self.failures} failures, "
+                    f"failing fast for {self.reset_timeout:.0f}s"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.opened,
+            "rejected": self.rejected,
+            "retry_in": round(retry_in, 1),
+        }
+
+
+def backoff_delay(attempt: int, base: float = BACKEND_BACKOFF_BASE, cap: float = BACKEND_BACKOFF_MAX) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _safe_to_retry(method: str, error: Optional[Exception]) -> bool:
+    if method in IDEMPOTENT_METHODS:
+        return True
+    # A POST that never connected never reached the backend, so sending it again is safe
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+async def call_with_retries(
+    breaker: CircuitBreaker,
+    method: str,
+    send: Callable[[], Awaitable[httpx.Response]],
+    retries: int = BACKEND_RETRIES,
+) -> httpx.Response:
+    """
+    Run `send` behind the circuit breaker, retrying transport errors and 429/5xx gateway
+    responses with backoff when the method is safe to repeat.
+
+    Raises CircuitOpenError without calling the backend while the breaker is open.
+    """
+    method = method.upper()
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(f"backend circuit '{breaker.name}' is open")
+
+        error: Optional[Exception] = None
+        response: Optional[httpx.Response] = None
+        try:
+            response = await send()
+        except httpx.TransportError as e:
+            error = e
+
+        if error is None and response.status_code not in RETRYABLE_STATUSES and response.status_code < 500:
+            breaker.record_success()
+            return response
+
+        breaker.record_failure()
+        delay = backoff_delay(attempt)
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                delay = min(BACKEND_BACKOFF_MAX, float(retry_after))
+
+        out_of_budget = time.monotonic() - started + delay > BACKEND_RETRY_BUDGET
+        if (
+            attempt >= retries
+            or out_of_budget
+            or not _safe_to_retry(method, error)
+            or breaker.state == CircuitBreaker.OPEN
+        ):
+            if error is not None:
+                raise error
+            return response
+
+        reason = type(error).__name__ if error is not None else response.status_code
+        logger.info(f"🔁 Retrying {method} in {delay:.2f}s after {reason} (attempt {attempt + 1}/{retries})")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies for one kind of request"""
+
+    def __init__(self, name: str, window: int = 200):
+        self.name = name
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """p95 of recent requests, None until there are enough samples to trust it"""
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, self.percentile(0.95)))
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "samples": len(self._samples),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+async def hedged(tracker: LatencyTracker, send: Callable[[], Awaitable[Any]], enabled: bool = BACKEND_HEDGED_READS) -> Any:
+    """
+    Run an idempotent read; if it hasn't finished after the tracker's p95, send a duplicate
+    and take whichever succeeds first. Only the slowest ~5% of calls cost a second request.
+    """
+    async def timed():
+        started = time.monotonic()
+        result = await send()
+        tracker.record(time.monotonic() - started)
+        return result
+
+    delay = tracker.hedge_delay() if enabled else None
+    if delay is None:
+        return await timed()
+
+    first = asyncio.create_task(timed())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    tracker.hedged += 1
+    second = asyncio.create_task(timed())
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        tracker.hedge_wins += 1
+                    return task.result()
+        # Both failed: surface the original request's error
+        return first.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,99 @@
+# routes.py
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# How long a learned URL / endpoint choice is trusted before it's re-learned from scratch
+ROUTE_TTL = float(os.getenv("ROUTE_TTL", "3600"))
+
+
+class RouteTable:
+    """
+    Remembers where each logical backend endpoint really lives.
+
+    When a request is redirected (http -> https, a trailing slash, another host) the final
+    URL is learned as prefix + path + suffix for that endpoint template, so later calls go
+    straight there in one round trip. For endpoints with alternatives (e.g. two create
+    routes) it remembers which one worked. Everything expires after `ttl` and can be
+    forgotten on failure.
+    """
+
+    def __init__(self, ttl: float = ROUTE_TTL):
+        self.ttl = ttl
+        # template -> (prefix, suffix, learned_at)
+        self._routes: Dict[str, Tuple[str, str, float]] = {}
+        # logical name -> (template that worked, chosen_at)
+        self._choices: Dict[str, Tuple[str, float]] = {}
+        self.learned = 0
+        self.forgotten = 0
+
+    def _fresh(self, learned_at: float) -> bool:
+        return time.monotonic() - learned_at < self.ttl
+
+    def is_learned(self, template: str) -> bool:
+        route = self._routes.get(template)
+        return route is not None and self._fresh(route[2])
+
+    def url(self, template: str, base: str, path: str) -> str:
+        """The URL to call for `path` (a filled-in `template`)"""
+        route = self._routes.get(template)
+        if route and self._fresh(route[2]):
+            return f"{route[0]}{path}{route[1]}"
+        return f"{base}{path}"
+
+    def observe(self, template: str, path: str, response: httpx.Response) -> None:
+        """Learn the final location of a redirected request"""
+        if not response.history:
+            return
+        final = str(response.url.copy_with(query=None))
+        index = final.rfind(path)
+        if index < 0:
+            # The path itself was rewritten; nothing general to learn for other ids
+            logger.info(f"ℹ️ {template} redirected to {final}, not learnable")
+            return
+        prefix, suffix = final[:index], final[index + len(path):]
+        self._routes[template] = (prefix, suffix, time.monotonic())
+        self.learned += 1
+        logger.info(f"🧭 Learned {template} -> {prefix}{template}{suffix}, skipping the redirect from now on")
+
+    def forget(self, template: str) -> None:
+        if self._routes.pop(template, None) is not None:
+            self.forgotten += 1
+            logger.info(f"🧭 Forgot learned route for {template}")
+
+    def ordered(self, name: str, candidates: Sequence[str]) -> List[str]:
+        """Candidates with the one that last worked first"""
+        choice = self._choices.get(name)
+        if choice and self._fresh(choice[1]) and choice[0] in candidates:
+            return [choice[0]] + [c for c in candidates if c != choice[0]]
+        return list(candidates)
+
+    def choose(self, name: str, template: str) -> None:
+        previous = self._choices.get(name)
+        if previous is None or previous[0] != template:
+            logger.info(f"🧭 Using {template} for {name}")
+        self._choices[name] = (template, time.monotonic())
+
+    def unchoose(self, name: str) -> None:
+        self._choices.pop(name, None)
+
+    def chosen(self, name: str) -> Optional[str]:
+        choice = self._choices.get(name)
+        return choice[0] if choice and self._fresh(choice[1]) else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routes": {
+                template: f"{prefix}{template}{suffix}"
+                for template, (prefix, suffix, learned_at) in self._routes.items()
+                if self._fresh(learned_at)
+            },
+            "choices": {name: self.chosen(name) for name in self._choices},
+            "learned": self.learned,
+            "forgotten": self.forgotten,
+        }
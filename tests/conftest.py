@@ -0,0 +1,49 @@
+# tests/conftest.py
+import os
+
+# Deterministic backend behaviour: no retries/backoff sleeps, no hedged duplicate reads
+os.environ.setdefault("BACKEND_RETRIES", "0")
+os.environ.setdefault("BACKEND_HEDGED_READS", "false")
+os.environ.setdefault("API_BASE_URL", "http://backend.test")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+import api_client  # noqa: E402
+from conditional import ConditionalStore  # noqa: E402
+from resilience import CircuitBreaker, LatencyTracker  # noqa: E402
+from routes import RouteTable  # noqa: E402
+
+
+class FakeBackend:
+    """httpx.MockTransport handler recording every request; tests set `handler`"""
+
+    def __init__(self):
+        self.requests = []
+        self.handler = lambda request: httpx.Response(404)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.handler(request)
+
+    def calls(self):
+        return [(r.method, r.url.path) for r in self.requests]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """api_client wired to an in-memory backend, with fresh caches and learned state"""
+    fake = FakeBackend()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake), follow_redirects=True)  # as in production
+    monkeypatch.setattr(api_client, "_client", client)
+    monkeypatch.setattr(api_client, "backend_breaker", CircuitBreaker("test"))
+    monkeypatch.setattr(api_client, "routes", RouteTable())
+    monkeypatch.setattr(api_client, "conditional", ConditionalStore())
+    monkeypatch.setattr(api_client, "profile_latency", LatencyTracker("test"))
+    monkeypatch.setattr(api_client, "_unsupported_until", {})
+    monkeypatch.setattr(api_client, "_last_leaderboard_page", None)
+    api_client.profile_cache.clear()
+    api_client.server_state.clear()
+    yield fake
+    api_client.profile_cache.clear()
+    api_client.server_state.clear()
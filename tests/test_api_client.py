@@ -0,0 +1,135 @@
+# tests/test_api_client.py
+import asyncio
+import json
+
+import httpx
+
+import api_client
+
+PROFILE = {
+    "id": 42, "username": "ada", "phone": "", "score": 900,
+    "flags_level": 3, "maps_level": 2, "attires_level": 1,
+    "flags_stars": {"1": 3}, "maps_stars": {}, "attires_stars": {},
+}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_put_fallback_merges_partial_update_onto_server_copy(backend):
+    def handler(request):
+        if request.method == "PATCH":
+            return httpx.Response(405)
+        if request.method == "PUT":
+            return httpx.Response(200, json=json.loads(request.content))
+        return httpx.Response(404)
+
+    backend.handler = handler
+    api_client._cache_profile(dict(PROFILE))
+
+    updated = run(api_client.update_user(42, {"id": 42, "username": "ada", "phone": "+2519"}))
+
+    sent = json.loads(backend.requests[-1].content)
+    assert backend.requests[-1].method == "PUT"
+    assert sent["score"] == 900 and sent["flags_stars"] == {"1": 3} and sent["phone"] == "+2519"
+    assert updated["score"] == 900
+    assert api_client.peek_user(42)["score"] == 900
+
+
+def test_update_without_server_copy_reads_it_first(backend):
+    def handler(request):
+        if request.method == "GET":
+            return httpx.Response(200, json=PROFILE)
+        if request.method == "PATCH":
+            return httpx.Response(200, json={**PROFILE, **json.loads(request.content)})
+        return httpx.Response(404)
+
+    backend.handler = handler
+    updated = run(api_client.update_user(42, {"phone": "+2519"}))
+
+    assert backend.calls() == [("GET", "/users/42"), ("PATCH", "/users/42")]
+    assert json.loads(backend.requests[-1].content) == {"phone": "+2519"}
+    assert updated["score"] == 900
+
+
+def test_update_of_unknown_user_sends_nothing(backend):
+    backend.handler = lambda request: httpx.Response(404, json={"detail": "User not found"})
+
+    assert run(api_client.update_user(42, {"phone": "+2519"})) is None
+    assert [method for method, _ in backend.calls()] == ["GET"]
+
+
+def test_queued_update_is_only_returned_on_top_of_a_server_copy(backend, monkeypatch):
+    from write_behind import WriteBehindQueue
+
+    monkeypatch.setattr(api_client, "WRITE_BEHIND", "on")
+    monkeypatch.setattr(api_client, "user_writes", WriteBehindQueue(interval=60))
+
+    async def scenario():
+        # Nothing known yet: no partial "profile" comes back
+        assert await api_client.queue_user_update(42, {"phone": "+2519"}) is None
+        api_client._cache_profile(dict(PROFILE))
+        doc = await api_client.queue_user_update(42, {"phone": "+2519"})
+        assert doc["phone"] == "+2519" and doc["score"] == 900
+        api_client.user_writes._timer.cancel()
+
+    run(scenario())
+
+
+BOARD = [{"id": i, "username": f"p{i}", "score": 1000 - i} for i in range(40)]
+
+
+def paged_board(request):
+    params = request.url.params
+    if "limit" not in params:
+        return httpx.Response(200, json=BOARD)
+    offset, limit = int(params["offset"]), int(params["limit"])
+    return httpx.Response(200, json=BOARD[offset:offset + limit])
+
+
+def test_leaderboard_page_sends_one_paging_parameter(backend, monkeypatch):
+    import leaderboard
+
+    monkeypatch.setattr(leaderboard, "leaderboard_cache", leaderboard.LeaderboardCache())
+    backend.handler = paged_board
+
+    page = run(api_client.get_leaderboard_page(15, 15))
+
+    assert dict(backend.requests[-1].url.params) == {"offset": "15", "limit": "15"}
+    assert [entry["id"] for entry in page["entries"]] == list(range(15, 30))
+
+
+def test_bare_list_page_without_snapshot_has_no_made_up_total(backend, monkeypatch):
+    import leaderboard
+
+    monkeypatch.setattr(leaderboard, "leaderboard_cache", leaderboard.LeaderboardCache())
+    backend.handler = paged_board
+
+    full = run(api_client.get_leaderboard_page(15, 15))
+    last = run(api_client.get_leaderboard_page(30, 15))
+
+    assert full["total"] is None and full["has_more"]
+    assert last["total"] is None and not last["has_more"]
+
+
+def test_backend_ignoring_offset_falls_back_to_snapshot(backend, monkeypatch):
+    import leaderboard
+
+    monkeypatch.setattr(leaderboard, "leaderboard_cache", leaderboard.LeaderboardCache())
+
+    def first_rows_only(request):
+        params = request.url.params
+        if "limit" not in params:
+            return httpx.Response(200, json=BOARD)
+        return httpx.Response(200, json=BOARD[:int(params["limit"])])
+
+    backend.handler = first_rows_only
+
+    first = run(api_client.get_leaderboard_page(0, 15))
+    second = run(api_client.get_leaderboard_page(15, 15))
+
+    assert [entry["id"] for entry in first["entries"]] == list(range(15))
+    assert [entry["id"] for entry in second["entries"]] == list(range(15, 30))
+    assert second["total"] == 40
+    assert not api_client._endpoint_supported("leaderboard_page")
@@ -0,0 +1,73 @@
+# tests/test_conditional.py
+import asyncio
+
+import httpx
+
+import api_client
+from conditional import ConditionalStore
+
+KEY = ("/users/{id}", 42)
+PROFILE = {"id": 42, "username": "ada", "score": 900}
+
+
+def ok(body=PROFILE, **headers):
+    return httpx.Response(200, json=body, headers=headers)
+
+
+def test_validators_are_sent_and_304_returns_the_stored_object():
+    store = ConditionalStore()
+    assert store.headers_for(KEY) == {}
+
+    first, changed = store.resolve(KEY, ok(etag='"v1"', **{"last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"}))
+    assert changed
+    assert store.headers_for(KEY) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+    again, changed = store.resolve(KEY, httpx.Response(304))
+    assert again is first and not changed
+    assert store.stats()["not_modified"] == 1
+
+
+def test_identical_body_without_validators_is_not_decoded_again():
+    store = ConditionalStore()
+    first, _ = store.resolve(KEY, ok())
+    again, changed = store.resolve(KEY, ok())
+
+    assert again is first and not changed
+    assert store.stats()["decodes"] == 1
+    assert store.stats()["unchanged_bodies"] == 1
+
+    updated, changed = store.resolve(KEY, ok({**PROFILE, "score": 950}))
+    assert changed and updated["score"] == 950
+
+
+def test_forgotten_entry_has_no_body():
+    store = ConditionalStore()
+    store.resolve(KEY, ok(etag='"v1"'))
+    assert store.has_body(KEY)
+
+    store.forget(KEY)
+    assert not store.has_body(KEY)
+    assert store.headers_for(KEY) == {}
+
+
+def test_304_after_eviction_refetches_without_validators(backend):
+    def handler(request):
+        if request.headers.get("if-none-match"):
+            # The stored copy is evicted while this request is out
+            api_client.conditional.forget(KEY)
+            return httpx.Response(304)
+        return ok(etag='"v1"')
+
+    backend.handler = handler
+
+    async def scenario():
+        assert (await api_client.get_user_by_tg_id(42, use_cache=False))["score"] == 900
+        return await api_client.get_user_by_tg_id(42, use_cache=False)
+
+    user = asyncio.run(scenario())
+
+    assert user is not None and user["score"] == 900
+    assert [r.headers.get("if-none-match") for r in backend.requests] == [None, '"v1"', None]
@@ -0,0 +1,72 @@
+# tests/test_dedup.py
+import asyncio
+
+from dedup import MemoryDedupBackend
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_duplicates_within_window():
+    dedup = MemoryDedupBackend(window=64)
+
+    async def scenario():
+        assert not await dedup.seen(1000)
+        assert not await dedup.seen(1002)
+        assert not await dedup.seen(1001)
+        assert await dedup.seen(1000)
+        assert await dedup.seen(1002)
+
+    run(scenario())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_late_redelivery_far_below_is_a_duplicate_and_keeps_tracking():
+    dedup = MemoryDedupBackend(window=64, clock=FakeClock())
+
+    async def scenario():
+        assert not await dedup.seen(5000)
+        assert not await dedup.seen(5001)
+        assert await dedup.seen(100)
+        # Tracking around the current ids survived the stray redelivery
+        assert await dedup.seen(5001)
+        assert not await dedup.seen(5002)
+
+    run(scenario())
+
+
+def test_lower_id_after_a_quiet_period_starts_a_new_sequence():
+    clock = FakeClock()
+    dedup = MemoryDedupBackend(window=4096, sequence_idle=86400, clock=clock)
+
+    async def scenario():
+        assert not await dedup.seen(500000001)
+        # Telegram picked a new, lower random id after a quiet week
+        clock.now += 7 * 86400
+        assert not await dedup.seen(123456789)
+        assert not await dedup.seen(123456790)
+        assert await dedup.seen(123456789)
+
+    run(scenario())
+
+
+def test_large_jump_resets_the_bitmap():
+    dedup = MemoryDedupBackend(window=4096)
+
+    async def scenario():
+        assert not await dedup.seen(1)
+        assert not await dedup.seen(1_000_000_001)
+        # The bitmap stays window-sized instead of being shifted by the whole gap
+        assert dedup._bits.bit_length() <= dedup.window
+        assert await dedup.seen(1_000_000_001)
+        assert not await dedup.seen(1_000_000_000)
+
+    run(scenario())
@@ -0,0 +1,169 @@
+# tests/test_dispatcher.py
+import asyncio
+import inspect
+from datetime import datetime, timezone
+
+from telegram import Chat, Message, Update, User
+
+from dispatcher import PerUserUpdateProcessor
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(timezone.utc),
+        chat=Chat(user_id, Chat.PRIVATE),
+        from_user=User(user_id, "Test", False),
+        text="hi",
+    )
+    return Update(update_id, message=message)
+
+
+def recorder(log, name, gate=None):
+    async def handler():
+        log.append(f"{name} start")
+        if gate is not None:
+            await gate.wait()
+        else:
+            await asyncio.sleep(0)
+        log.append(f"{name} end")
+    return handler()
+
+
+def test_same_user_updates_run_in_order():
+    processor = PerUserUpdateProcessor(max_concurrent_updates=8)
+    log = []
+
+    async def scenario():
+        gate = asyncio.Event()
+        first = asyncio.create_task(processor.process_in_order(make_update(1, 7), recorder(log, "a", gate)))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(processor.process_in_order(make_update(2, 7), recorder(log, "b")))
+        await asyncio.sleep(0.01)
+        assert log == ["a start"]
+        gate.set()
+        await asyncio.gather(first, second)
+
+    run(scenario())
+    assert log == ["a start", "a end", "b start", "b end"]
+
+
+def test_other_users_are_not_blocked():
+    processor = PerUserUpdateProcessor(max_concurrent_updates=8)
+    log = []
+
+    async def scenario():
+        gate = asyncio.Event()
+        slow = asyncio.create_task(processor.process_in_order(make_update(1, 7), recorder(log, "a", gate)))
+        await asyncio.sleep(0)
+        await processor.process_in_order(make_update(2, 8), recorder(log, "b"))
+        assert log == ["a start", "b start", "b end"]
+        gate.set()
+        await slow
+
+    run(scenario())
+
+
+def test_direct_process_update_still_orders():
+    # The polling path: PTB calls the (final) process_update without dispatch_update
+    processor = PerUserUpdateProcessor(max_concurrent_updates=8)
+    log = []
+
+    async def scenario():
+        gate = asyncio.Event()
+        first = asyncio.create_task(processor.process_update(make_update(1, 7), recorder(log, "a", gate)))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(processor.process_update(make_update(2, 7), recorder(log, "b")))
+        await asyncio.sleep(0.01)
+        assert log == ["a start"]
+        gate.set()
+        await asyncio.gather(first, second)
+
+    run(scenario())
+    assert log == ["a start", "a end", "b start", "b end"]
+
+
+def test_process_without_waiting_chains_same_user_updates():
+    processor = PerUserUpdateProcessor(max_concurrent_updates=8)
+    log = []
+
+    async def scenario():
+        gate = asyncio.Event()
+        worker = asyncio.create_task(processor.process_without_waiting(make_update(1, 7), recorder(log, "a", gate)))
+        await asyncio.sleep(0)
+        # Returns at once: the update is left for the worker already running this user
+        await asyncio.wait_for(processor.process_without_waiting(make_update(2, 7), recorder(log, "b")), 0.1)
+        await asyncio.wait_for(processor.process_without_waiting(make_update(3, 7), recorder(log, "c")), 0.1)
+        assert processor.chained == 2
+        assert processor.metrics()["backlogged"] == 2
+        gate.set()
+        await worker
+        assert processor.metrics()["backlogged"] == 0
+
+    run(scenario())
+    assert log == ["a start", "a end", "b start", "b end", "c start", "c end"]
+
+
+def test_failing_update_does_not_stop_the_backlog():
+    processor = PerUserUpdateProcessor(max_concurrent_updates=8)
+    log = []
+
+    async def boom(gate):
+        await gate.wait()
+        raise RuntimeError("handler failed")
+
+    async def scenario():
+        gate = asyncio.Event()
+        worker = asyncio.create_task(processor.process_without_waiting(make_update(1, 7), boom(gate)))
+        await asyncio.sleep(0)
+        await processor.process_without_waiting(make_update(2, 7), recorder(log, "b"))
+        gate.set()
+        await worker
+
+    run(scenario())
+    assert log == ["b start", "b end"]
+
+
+def test_cancelling_the_worker_closes_backlogged_coroutines():
+    processor = PerUserUpdateProcessor(max_concurrent_updates=8)
+    log = []
+
+    async def scenario():
+        gate = asyncio.Event()
+        worker = asyncio.create_task(processor.process_without_waiting(make_update(1, 7), recorder(log, "a", gate)))
+        await asyncio.sleep(0)
+        pending = recorder(log, "b")
+        await processor.process_without_waiting(make_update(2, 7), pending)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return pending
+
+    pending = run(scenario())
+    assert inspect.getcoroutinestate(pending) == inspect.CORO_CLOSED
+    assert log == ["a start"]
+    assert processor.metrics()["backlogged"] == 0
+
+
+def test_idle_locks_are_evicted_but_busy_ones_kept():
+    processor = PerUserUpdateProcessor(max_concurrent_updates=8, max_locks=2)
+
+    async def scenario():
+        gate = asyncio.Event()
+        busy = asyncio.create_task(processor.process_in_order(make_update(1, 1), recorder([], "busy", gate)))
+        await asyncio.sleep(0)
+        for user_id in range(2, 7):
+            await processor.process_in_order(make_update(user_id, user_id), recorder([], "idle"))
+        assert len(processor._locks) <= 2
+        assert ("user", 1) in processor._locks
+        assert processor.user_busy(1) and not processor.user_busy(6)
+        gate.set()
+        await busy
+        assert not processor.user_busy(1)
+
+    run(scenario())
+    assert processor.evictions == 4
+    assert processor.metrics()["locks"] == 2
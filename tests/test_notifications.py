@@ -0,0 +1,100 @@
+# tests/test_notifications.py
+import asyncio
+
+import notifications
+from background import BackgroundTasks
+from notifications import TELEGRAM_MESSAGE_LIMIT, NotificationDigest
+
+ADMIN_CHAT = -100123
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.sent.append((chat_id, text))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_repeated_events_are_merged_into_one_line():
+    bot = FakeBot()
+
+    async def scenario():
+        digest = NotificationDigest(interval=60, max_events=10)
+        digest.add(bot, ADMIN_CHAT, 42, "ada", "", "new_user")
+        digest.add(bot, ADMIN_CHAT, 42, "ada", "+2519", "new_user")
+        digest.add(bot, ADMIN_CHAT, 43, "bob", "", "new_user")
+        assert digest.stats()["buffered"] == 2 and digest.events_merged == 1
+        await digest.close()
+
+    run(scenario())
+    assert len(bot.sent) == 1
+    chat_id, text = bot.sent[0]
+    assert chat_id == ADMIN_CHAT
+    assert "2 events" in text and "×2" in text and "+2519" in text
+
+
+def test_full_buffer_flushes_without_waiting_for_the_timer(monkeypatch):
+    bot = FakeBot()
+
+    async def scenario():
+        tasks = BackgroundTasks()
+        monkeypatch.setattr(notifications, "background", tasks)
+        digest = NotificationDigest(interval=60, max_events=2)
+        digest.add(bot, ADMIN_CHAT, 42, "ada", "", "new_user")
+        digest.add(bot, ADMIN_CHAT, 43, "bob", "", "new_user")
+        # The size-triggered flush is tracked, so a request-scoped drain waits for it
+        assert await tasks.drain(timeout=1)
+        assert digest.stats()["buffered"] == 0
+        digest._timer.cancel()
+
+    run(scenario())
+    assert len(bot.sent) == 1
+
+
+def test_timer_flushes_a_partial_buffer():
+    bot = FakeBot()
+
+    async def scenario():
+        digest = NotificationDigest(interval=0.01, max_events=10)
+        digest.add(bot, ADMIN_CHAT, 42, "ada", "", "new_user")
+        assert bot.sent == []
+        await asyncio.sleep(0.05)
+        assert digest.digests_sent == 1
+
+    run(scenario())
+    assert len(bot.sent) == 1
+
+
+def test_long_digest_is_split_under_the_message_limit():
+    bot = FakeBot()
+
+    async def scenario():
+        digest = NotificationDigest(interval=60, max_events=1000)
+        for user_id in range(200):
+            digest.add(bot, ADMIN_CHAT, user_id, f"user_{user_id}", "+251900000000", "new_user", "x" * 40)
+        await digest.close()
+
+    run(scenario())
+    assert len(bot.sent) > 1
+    assert all(len(text) <= TELEGRAM_MESSAGE_LIMIT for _, text in bot.sent)
+    assert sum(text.count("• ") for _, text in bot.sent) == 200
+
+
+def test_failed_send_does_not_raise():
+    class BrokenBot:
+        async def send_message(self, **kwargs):
+            raise RuntimeError("network down")
+
+    async def scenario():
+        digest = NotificationDigest(interval=60, max_events=10)
+        digest.add(BrokenBot(), ADMIN_CHAT, 42, "ada", "", "new_user")
+        await digest.close()
+        return digest
+
+    digest = run(scenario())
+    assert digest.digests_sent == 0 and digest.stats()["buffered"] == 0
@@ -0,0 +1,29 @@
+# tests/test_persistence.py
+import asyncio
+
+from persistence import SQLiteUserDataPersistence
+
+
+def test_eviction_skips_users_with_an_update_running(tmp_path):
+    persistence = SQLiteUserDataPersistence(path=str(tmp_path / "user_data.sqlite3"), working_set=2)
+    busy = {1}
+    persistence.is_busy = lambda user_id: user_id in busy
+    dicts = {user_id: {"contact_shared": True, "n": user_id} for user_id in (1, 2, 3)}
+
+    async def scenario():
+        for user_id, user_data in dicts.items():
+            await persistence.refresh_user_data(user_id, user_data)
+        await persistence.flush()
+
+    asyncio.run(scenario())
+
+    # User 1 is the oldest but still busy: user 2 was unloaded instead
+    assert dicts[1] == {"contact_shared": True, "n": 1}
+    assert dicts[2] == {}
+    assert persistence.stats()["loaded"] == 2
+    assert persistence.busy_skips == 1
+
+    # The unloaded user's data was staged and comes back on their next update
+    restored = {}
+    asyncio.run(persistence.refresh_user_data(2, restored))
+    assert restored == {"contact_shared": True, "n": 2}
@@ -0,0 +1,165 @@
+# tests/test_rate_limiter.py
+import asyncio
+from datetime import timedelta
+
+import pytest
+from telegram.error import RetryAfter
+
+import rate_limiter
+from rate_limiter import LANES, PriorityGate, PriorityRateLimiter, TokenBucket
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    return fake
+
+
+def test_token_bucket_spends_burst_then_refills(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert bucket.take() == 0.0
+    assert not bucket.idle
+
+    clock.now += 10
+    assert bucket.idle
+
+
+def test_token_bucket_block_overrides_tokens(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    bucket.block(5)
+
+    assert bucket.take() == pytest.approx(5)
+    clock.now += 5
+    assert bucket.take() == 0.0
+
+
+def test_priority_gate_serves_lanes_in_priority_then_fifo():
+    gate = PriorityGate(TokenBucket(rate=100, capacity=1))
+    served = []
+
+    async def send(name, lane):
+        await gate.acquire(LANES[lane])
+        served.append(name)
+
+    async def scenario():
+        await gate.acquire(LANES["user"])  # spend the only token so everyone queues
+        tasks = [
+            asyncio.create_task(send("bulk", "bulk")),
+            asyncio.create_task(send("admin", "admin")),
+            asyncio.create_task(send("user-1", "user")),
+            asyncio.create_task(send("user-2", "user")),
+        ]
+        await asyncio.sleep(0)
+        assert gate.depth() == {"user": 2, "admin": 1, "bulk": 1}
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert served == ["user-1", "user-2", "admin", "bulk"]
+    assert gate.idle or gate.depth() == {"user": 0, "admin": 0, "bulk": 0}
+
+
+def test_cancelled_waiter_does_not_take_the_token():
+    gate = PriorityGate(TokenBucket(rate=100, capacity=1))
+    served = []
+
+    async def send(name):
+        await gate.acquire(LANES["user"])
+        served.append(name)
+
+    async def scenario():
+        await gate.acquire(LANES["user"])
+        gone = asyncio.create_task(send("gone"))
+        kept = asyncio.create_task(send("kept"))
+        await asyncio.sleep(0)
+        gone.cancel()
+        await kept
+
+    asyncio.run(scenario())
+    assert served == ["kept"]
+
+
+@pytest.fixture
+def fast_chats(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_CHAT_PER_SEC", 100)
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_CHAT_BURST", 1)
+
+
+def test_sends_to_one_chat_keep_their_order(fast_chats):
+    limiter = PriorityRateLimiter()
+    sent = []
+
+    async def send(n):
+        async def callback():
+            sent.append(n)
+            return True
+        return await limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": 7}, None)
+
+    async def scenario():
+        await asyncio.gather(*(send(n) for n in range(8)))
+
+    asyncio.run(scenario())
+    assert sent == list(range(8))
+
+
+def test_retry_after_pauses_only_that_chat(fast_chats):
+    limiter = PriorityRateLimiter()
+    calls = []
+
+    async def scenario():
+        async def flooded():
+            calls.append("flooded")
+            if calls.count("flooded") == 1:
+                raise RetryAfter(timedelta(seconds=0.2))
+            return True
+
+        async def other():
+            calls.append("other")
+            return True
+
+        first = asyncio.create_task(limiter.process_request(flooded, (), {}, "sendMessage", {"chat_id": 1}, None))
+        await asyncio.sleep(0.01)
+        # Another chat goes straight through while chat 1 is paused
+        await asyncio.wait_for(limiter.process_request(other, (), {}, "sendMessage", {"chat_id": 2}, None), 0.1)
+        assert calls == ["flooded", "other"]
+        assert await first
+        assert calls == ["flooded", "other", "flooded"]
+
+    asyncio.run(scenario())
+    assert limiter.retry_afters == 1
+    assert limiter.global_pauses == 0
+
+
+def test_retry_after_on_several_chats_pauses_everything(fast_chats):
+    limiter = PriorityRateLimiter()
+
+    async def flooded():
+        raise RetryAfter(timedelta(seconds=5))
+
+    async def scenario():
+        tasks = [
+            asyncio.create_task(limiter.process_request(flooded, (), {}, "sendMessage", {"chat_id": chat}, None))
+            for chat in (1, 2)
+        ]
+        await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return limiter._global.bucket.take()
+
+    wait = asyncio.run(scenario())
+    assert limiter.global_pauses == 1
+    assert wait > 4
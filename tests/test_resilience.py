@@ -0,0 +1,132 @@
+# tests/test_resilience.py
+import asyncio
+
+import httpx
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, call_with_retries
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # a success resets the streak
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["retry_in"] == 30
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened == 2
+    clock.now += 29
+    assert not breaker.allow()
+
+
+def test_lost_probe_does_not_block_forever(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()  # this probe never reports back (e.g. cancelled)
+
+    clock.now += 30
+    assert breaker.allow()
+
+
+def sender(responses):
+    """A send() replaying `responses` (a Response or an exception each) through MockTransport"""
+    replies = iter(responses)
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://backend.test")
+    return (lambda method: lambda: client.request(method, "/users/42")), sent
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0.0)
+
+
+def test_idempotent_call_is_retried_on_gateway_errors(no_backoff):
+    send, sent = sender([httpx.Response(503), httpx.Response(502), httpx.Response(200)])
+    breaker = CircuitBreaker("test", failure_threshold=5)
+
+    response = asyncio.run(call_with_retries(breaker, "GET", send("GET"), retries=2))
+
+    assert response.status_code == 200 and len(sent) == 3
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_post_is_only_retried_when_it_never_connected(no_backoff):
+    send, sent = sender([httpx.Response(503)])
+    response = asyncio.run(call_with_retries(CircuitBreaker("test"), "POST", send("POST"), retries=2))
+    assert response.status_code == 503 and len(sent) == 1
+
+    send, sent = sender([httpx.ConnectError("refused"), httpx.Response(201)])
+    response = asyncio.run(call_with_retries(CircuitBreaker("test"), "POST", send("POST"), retries=2))
+    assert response.status_code == 201 and len(sent) == 2
+
+
+def test_open_breaker_fails_fast_without_calling(no_backoff):
+    send, sent = sender([httpx.Response(503), httpx.Response(503)])
+    breaker = CircuitBreaker("test", failure_threshold=2)
+
+    # Retrying stops as soon as the breaker opens
+    response = asyncio.run(call_with_retries(breaker, "GET", send("GET"), retries=5))
+    assert response.status_code == 503 and len(sent) == 2
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_retries(breaker, "GET", send("GET")))
+    assert len(sent) == 2
@@ -0,0 +1,134 @@
+# tests/test_routes.py
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import api_client
+import routes
+from routes import RouteTable
+
+PROFILE = {"id": 42, "username": "ada", "phone": "", "score": 900}
+NOT_FOUND = {"detail": "Not Found"}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(routes, "time", fake)
+    return fake
+
+
+def redirected(final_url: str, original_url: str) -> httpx.Response:
+    hop = httpx.Response(307, request=httpx.Request("GET", original_url))
+    response = httpx.Response(200, request=httpx.Request("GET", final_url))
+    response.history = [hop]
+    return response
+
+
+def test_redirect_is_learned_per_template_and_expires(clock):
+    table = RouteTable(ttl=60)
+    table.observe(
+        "/users/{id}", "/users/42",
+        redirected("https://api.example.com/v1/users/42/", "http://example.com/users/42"),
+    )
+
+    assert table.url("/users/{id}", "http://example.com", "/users/7") == "https://api.example.com/v1/users/7/"
+    assert table.stats()["routes"] == {"/users/{id}": "https://api.example.com/v1/users/{id}/"}
+
+    clock.now += 60
+    assert not table.is_learned("/users/{id}")
+    assert table.url("/users/{id}", "http://example.com", "/users/7") == "http://example.com/users/7"
+
+
+def test_rewritten_path_is_not_learned(clock):
+    table = RouteTable()
+    table.observe("/users/{id}", "/users/42", redirected("https://example.com/profile", "http://example.com/users/42"))
+    assert not table.is_learned("/users/{id}")
+
+
+def test_choice_puts_the_working_candidate_first(clock):
+    table = RouteTable(ttl=60)
+    assert table.ordered("create_user", ["/users", "/api/users"]) == ["/users", "/api/users"]
+
+    table.choose("create_user", "/api/users")
+    assert table.ordered("create_user", ["/users", "/api/users"]) == ["/api/users", "/users"]
+
+    clock.now += 60
+    assert table.chosen("create_user") is None
+    assert table.ordered("create_user", ["/users", "/api/users"]) == ["/users", "/api/users"]
+
+
+def test_call_skips_the_redirect_once_learned(backend):
+    def handler(request):
+        if request.url.host == "backend.test":
+            return httpx.Response(307, headers={"location": f"https://api.backend.test/v1{request.url.path}/"})
+        return httpx.Response(200, json=PROFILE)
+
+    backend.handler = handler
+    run(api_client._call("GET", "/users/{id}", "/users/42"))
+    run(api_client._call("GET", "/users/{id}", "/users/7"))
+
+    assert [str(r.url) for r in backend.requests] == [
+        "http://backend.test/users/42",
+        "https://api.backend.test/v1/users/42/",
+        "https://api.backend.test/v1/users/7/",
+    ]
+
+
+def test_learned_route_that_disappears_is_forgotten(backend):
+    api_client.routes._routes["/users/{id}"] = ("https://old.backend.test", "", api_client.time.monotonic())
+
+    def handler(request):
+        if request.url.host == "old.backend.test":
+            return httpx.Response(404, json=NOT_FOUND)
+        return httpx.Response(200, json=PROFILE)
+
+    backend.handler = handler
+    response = run(api_client._call("GET", "/users/{id}", "/users/42"))
+
+    assert response.status_code == 200
+    assert [r.url.host for r in backend.requests] == ["old.backend.test", "backend.test"]
+    assert not api_client.routes.is_learned("/users/{id}")
+
+
+def test_create_remembers_the_endpoint_that_worked(backend):
+    def handler(request):
+        if request.url.path == "/users":
+            return httpx.Response(404, json=NOT_FOUND)
+        return httpx.Response(201, json={**json.loads(request.content)})
+
+    backend.handler = handler
+    run(api_client.create_user(dict(PROFILE)))
+    run(api_client.create_user({**PROFILE, "id": 43}))
+
+    assert backend.calls() == [("POST", "/users"), ("POST", "/api/users"), ("POST", "/api/users")]
+
+
+def test_missing_patch_route_switches_to_put(backend):
+    def handler(request):
+        if request.method == "PATCH":
+            return httpx.Response(405)
+        return httpx.Response(200, json=json.loads(request.content))
+
+    backend.handler = handler
+    api_client._cache_profile(dict(PROFILE))
+
+    run(api_client.update_user(42, {"phone": "+2519"}))
+    run(api_client.update_user(42, {"score": 950}))
+
+    assert backend.calls() == [("PATCH", "/users/42"), ("PUT", "/users/42"), ("PUT", "/users/42")]
+    assert json.loads(backend.requests[-1].content) == {**PROFILE, "phone": "+2519", "score": 950}
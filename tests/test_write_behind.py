@@ -0,0 +1,115 @@
+# tests/test_write_behind.py
+import asyncio
+import json
+
+import httpx
+
+import api_client
+import write_behind
+from write_behind import WriteBehindQueue
+
+PROFILE = {"id": 42, "username": "ada", "phone": "", "score": 900}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_updates_for_one_user_are_merged_and_overlaid():
+    async def scenario():
+        queue = WriteBehindQueue(interval=60)
+        queue.add(42, {"phone": "+2519"})
+        queue.add(42, {"score": 950})
+        queue.add(42, {"phone": "+2510"})
+        assert queue.stats()["pending"] == 1
+        assert queue.updates_merged == 2
+        # Read-your-writes: buffered fields win over the server copy, the rest is kept
+        assert queue.overlay(42, PROFILE) == {**PROFILE, "phone": "+2510", "score": 950}
+        assert queue.overlay(7, PROFILE) is PROFILE
+        queue._timer.cancel()
+
+    run(scenario())
+
+
+def test_flush_writes_one_bulk_request_and_clears_the_overlay(backend):
+    def handler(request):
+        if request.method == "PATCH" and request.url.path == "/users/bulk":
+            items = json.loads(request.content)
+            return httpx.Response(200, json=[{**PROFILE, **item} for item in items])
+        return httpx.Response(404)
+
+    backend.handler = handler
+    api_client._cache_profile(dict(PROFILE))
+
+    async def scenario():
+        queue = WriteBehindQueue(interval=60)
+        queue.add(42, {"phone": "+2519"})
+        queue.add(42, {"score": 950})
+        await queue.flush()
+        return queue
+
+    queue = run(scenario())
+
+    assert backend.calls() == [("PATCH", "/users/bulk")]
+    assert json.loads(backend.requests[0].content) == [{"id": 42, "phone": "+2519", "score": 950}]
+    assert queue.stats()["pending"] == 0 and queue.bulk_writes == 1
+    assert queue.overlay(42, PROFILE) is PROFILE
+    assert api_client.peek_user(42)["score"] == 950
+
+
+def test_writes_in_flight_stay_visible_to_reads(backend):
+    async def scenario():
+        released = asyncio.Event()
+        seen = {}
+
+        async def handler(request):
+            seen["overlay"] = queue.overlay(42, PROFILE)
+            await released.wait()
+            items = json.loads(request.content)
+            return httpx.Response(200, json=[{**PROFILE, **item} for item in items])
+
+        backend.handler = handler
+        api_client._cache_profile(dict(PROFILE))
+        queue = WriteBehindQueue(interval=60)
+        queue.add(42, {"score": 950})
+        flush = asyncio.create_task(queue.flush())
+        await asyncio.sleep(0.01)
+        released.set()
+        await flush
+        return seen
+
+    seen = run(scenario())
+    assert seen["overlay"]["score"] == 950
+
+
+def test_failed_write_is_requeued_under_newer_updates_then_dropped(backend, monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 2)
+
+    def handler(request):
+        if request.method == "GET":
+            return httpx.Response(200, json=PROFILE)
+        return httpx.Response(503)
+
+    backend.handler = handler
+    api_client._cache_profile(dict(PROFILE))
+
+    async def scenario():
+        queue = WriteBehindQueue(interval=60)
+        queue.add(42, {"phone": "+2519", "score": 950})
+        flush = asyncio.create_task(queue.flush())
+        await asyncio.sleep(0)
+        # Arrives while the failing flush is out
+        queue.add(42, {"score": 975})
+        await flush
+
+        # The failed fields come back, the newer score wins
+        assert queue._pending[42] == {"phone": "+2519", "score": 975}
+        assert queue.failures == 1 and queue.bulk_fallbacks == 1
+
+        await queue.flush()
+        assert queue.dropped == 1 and 42 not in queue._pending
+        queue._timer.cancel()
+
+    run(scenario())
+    # Bulk first, then the per-user fallback (which re-reads the invalidated profile)
+    assert backend.calls()[:3] == [("PATCH", "/users/bulk"), ("GET", "/users/42"), ("PATCH", "/users/42")]
@@ -0,0 +1,141 @@
+# update_queue.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# "inline" processes each update inside the webhook request (safe on serverless),
+# "queue" acks immediately and lets background workers process the update
+WEBHOOK_MODE = os.getenv("WEBHOOK_MODE", "inline").lower()
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+# What to do when the queue is full: "reject" (503, Telegram redelivers later),
+# "drop_oldest" (make room by discarding the oldest update) or "block" (wait for room)
+WEBHOOK_QUEUE_POLICY = os.getenv("WEBHOOK_QUEUE_POLICY", "reject").lower()
+WEBHOOK_QUEUE_BLOCK_TIMEOUT = float(os.getenv("WEBHOOK_QUEUE_BLOCK_TIMEOUT", "5"))
+
+POLICIES = ("reject", "drop_oldest", "block")
+
+
+class UpdateQueue:
+    """Bounded in-process update queue drained by a fixed pool of asyncio workers"""
+
+    def __init__(
+        self,
+        process: Callable[[Any], Awaitable[Any]],
+        workers: int = WEBHOOK_WORKERS,
+        maxsize: int = WEBHOOK_QUEUE_SIZE,
+        policy: str = WEBHOOK_QUEUE_POLICY,
+        block_timeout: float = WEBHOOK_QUEUE_BLOCK_TIMEOUT,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r}, expected one of {POLICIES}")
+        self._process = process
+        self.workers = workers
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.busy = 0
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._dequeued = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"📥 Update queue started ({self.workers} workers, size {self.maxsize}, policy {self.policy})")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Drain whatever is queued (up to timeout), then stop the workers"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Update queue stopped with {self._queue.qsize()} updates still pending")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("📥 Update queue stopped")
+
+    async def put(self, update: Any) -> bool:
+        """Enqueue an update according to the backpressure policy, False if it was refused"""
+        item = (time.monotonic(), update)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if self.policy == "reject":
+                self.rejected += 1
+                return False
+
+            if self.policy == "drop_oldest":
+                try:
+                    _, dropped = self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                    logger.warning(f"⚠️ Update queue full, dropped update {getattr(dropped, 'update_id', '?')}")
+                except asyncio.QueueEmpty:
+                    pass
+                self._queue.put_nowait(item)
+
+            else:  # block
+                try:
+                    await asyncio.wait_for(self._queue.put(item), self.block_timeout)
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    return False
+
+        self.enqueued += 1
+        return True
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            enqueued_at, update = await self._queue.get()
+            wait = time.monotonic() - enqueued_at
+            self._dequeued += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self.busy += 1
+            try:
+                await self._process(update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ Worker {index} failed processing update {getattr(update, 'update_id', '?')}: {e}")
+            finally:
+                self.busy -= 1
+                self._queue.task_done()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "mode": "queue",
+            "depth": self._queue.qsize() if self._queue else 0,
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "workers": self.workers,
+            "busy": self.busy,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._wait_total / self._dequeued * 1000, 1) if self._dequeued else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 1),
+        }
@@ -0,0 +1,59 @@
+# webhook_manager.py
+import hashlib
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Remembers what we last registered, so warm restarts on the same host skip the Bot API entirely
+WEBHOOK_STATE_PATH = os.getenv("WEBHOOK_STATE_PATH", "/tmp/gomida_webhook_state.json")
+
+
+def webhook_fingerprint(url: str, allowed_updates: Iterable[str], secret_token: Optional[str]) -> str:
+    """Stable hash of everything that requires re-registering the webhook when it changes"""
+    material = json.dumps([url, sorted(allowed_updates), secret_token or ""])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _read_state() -> Optional[str]:
+    try:
+        with open(WEBHOOK_STATE_PATH) as f:
+            return json.load(f).get("fingerprint")
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(fingerprint: str) -> None:
+    try:
+        with open(WEBHOOK_STATE_PATH, "w") as f:
+            json.dump({"fingerprint": fingerprint}, f)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not save webhook state to {WEBHOOK_STATE_PATH}: {e}")
+
+
+async def ensure_webhook(bot, url: str, allowed_updates: Iterable[str], secret_token: Optional[str] = None) -> str:
+    """
+    Register the webhook only if the URL, allowed_updates or secret changed.
+
+    Returns "cached" (no Bot API calls), "unchanged" (one getWebhookInfo) or "registered".
+    """
+    allowed_updates = sorted(allowed_updates)
+    fingerprint = webhook_fingerprint(url, allowed_updates, secret_token)
+
+    if _read_state() == fingerprint:
+        return "cached"
+
+    # The secret can't be read back from Telegram, so with a secret we always re-register
+    # unless our own state file says it's current
+    if not secret_token:
+        info = await bot.get_webhook_info()
+        if info.url == url and sorted(info.allowed_updates or []) == allowed_updates:
+            _write_state(fingerprint)
+            return "unchanged"
+
+    # set_webhook replaces any existing webhook, no delete_webhook needed
+    await bot.set_webhook(url, allowed_updates=allowed_updates, secret_token=secret_token)
+    _write_state(fingerprint)
+    return "registered"
@@ -0,0 +1,162 @@
+# write_behind.py
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from background import background
+
+logger = logging.getLogger(__name__)
+
+# "on" buffers user updates and writes them in batches, "off" writes each update immediately
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "on").lower()
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "2"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "50"))
+WRITE_BEHIND_CONCURRENCY = int(os.getenv("WRITE_BEHIND_CONCURRENCY", "8"))
+# Give up on a user's update after this many failed flushes
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "3"))
+
+
+class WriteBehindQueue:
+    """
+    Buffers user updates keyed by user ID and writes them out every N seconds or N users.
+
+    Updates for the same user are merged (latest value per field wins), so a burst of
+    /start, contact share and game progress becomes one write. Until a write is confirmed,
+    overlay() applies it on top of whatever the profile layer reads (read-your-writes).
+    """
+
+    def __init__(self, interval: float = WRITE_BEHIND_INTERVAL, max_pending: int = WRITE_BEHIND_MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        # Being written right now; still overlaid on reads until the backend confirms
+        self._inflight: Dict[int, Dict[str, Any]] = {}
+        self._attempts: Dict[int, int] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.updates_received = 0
+        self.updates_merged = 0
+        self.writes = 0
+        self.bulk_writes = 0
+        self.bulk_fallbacks = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def add(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        """Queue an update; never blocks the caller on network I/O"""
+        user_id = int(user_id)
+        self.updates_received += 1
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            pending.update(user_data)
+            self.updates_merged += 1
+        else:
+            self._pending[user_id] = dict(user_data)
+
+        if len(self._pending) >= self.max_pending:
+            # Tracked, so the flush isn't garbage-collected mid-write (and request-scoped drains wait for it)
+            background.spawn(self.flush(), name="user_writes_flush")
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    def overlay(self, user_id: int, user: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """The user document as it will be once buffered writes land"""
+        user_id = int(user_id)
+        inflight = self._inflight.get(user_id)
+        pending = self._pending.get(user_id)
+        if inflight is None and pending is None:
+            return user
+        merged = dict(user or {})
+        if inflight:
+            merged.update(inflight)
+        if pending:
+            merged.update(pending)
+        return merged
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.interval)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far"""
+        from api_client import bulk_update_users, update_user
+
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+
+            try:
+                results = await bulk_update_users(batch)
+                if results is not None:
+                    self.bulk_writes += 1
+                    # Users the bulk request didn't confirm (5xx, transport error) get written
+                    # one by one before the failure counts towards dropping the update
+                    remaining = {uid: data for uid, data in batch.items() if results.get(uid) is None}
+                    if remaining:
+                        self.bulk_fallbacks += 1
+                else:
+                    # No bulk endpoint: one diffed update per user
+                    results, remaining = {}, batch
+
+                if remaining:
+                    semaphore = asyncio.Semaphore(WRITE_BEHIND_CONCURRENCY)
+
+                    async def write(user_id: int, user_data: Dict[str, Any]):
+                        async with semaphore:
+                            return user_id, await update_user(user_id, user_data)
+
+                    written = await asyncio.gather(*(write(uid, data) for uid, data in remaining.items()))
+                    results.update(written)
+            except Exception as e:
+                logger.error(f"❌ Error flushing buffered user updates: {e}")
+                results = {}
+            finally:
+                self._inflight = {}
+
+            self.writes += len(batch)
+            for user_id, user_data in batch.items():
+                if results.get(user_id) is not None:
+                    self._attempts.pop(user_id, None)
+                    continue
+                self._requeue(user_id, user_data)
+            logger.info(f"💾 Flushed {len(batch)} buffered user updates")
+
+    def _requeue(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        self.failures += 1
+        attempts = self._attempts.get(user_id, 0) + 1
+        if attempts >= WRITE_BEHIND_MAX_ATTEMPTS:
+            self._attempts.pop(user_id, None)
+            self.dropped += 1
+            logger.error(f"❌ Dropping buffered update for user {user_id} after {attempts} failed writes")
+            return
+        self._attempts[user_id] = attempts
+        # Newer updates queued during the flush take precedence over the failed ones
+        self._pending[user_id] = {**user_data, **self._pending.get(user_id, {})}
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def close(self) -> None:
+        """Flush on shutdown and stop the timer"""
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": WRITE_BEHIND,
+            "pending": len(self._pending),
+            "inflight": len(self._inflight),
+            "updates_received": self.updates_received,
+            "updates_merged": self.updates_merged,
+            "writes": self.writes,
+            "bulk_writes": self.bulk_writes,
+            "bulk_fallbacks": self.bulk_fallbacks,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+
+user_writes = WriteBehindQueue()